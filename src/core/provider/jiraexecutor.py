@@ -0,0 +1,111 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:03
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils import logger as log
+
+logger = log.get_logger(__file__)
+
+# An operation on a single issue consisting of its name, e.g. ``create``, and a
+# callable which gets the result of the previous operation on the same issue.
+JiraOperation = Tuple[str, Callable[[Any], Any]]
+
+
+@dataclass
+class JiraOperationResult:
+    """
+    Outcome of a single operation executed by the `JiraWriteExecutor`.
+    """
+
+    key: str
+    operation: str
+    result: Any = None
+    error: Optional[Exception] = None
+    skipped: bool = False
+
+    @property
+    def ok(self) -> bool:
+        """
+        :return: True if the operation was executed without an error
+        """
+        return self.error is None and not self.skipped
+
+
+class JiraWriteExecutor:
+    """
+    Executes the write operations of multiple issues concurrently, while the
+    operations of a single issue are executed one after another in the order
+    they were given, e.g. create, update and then transition. At most
+    `max_in_flight` requests are sent to jira at the same time.
+
+    The operations only call the jira client they were created with, therefore
+    any server speaking the jira REST API can be used, e.g. a local stand-in
+    server in tests.
+    """
+
+    def __init__(self, max_in_flight: int = 1):
+        """
+        :param max_in_flight: maximum number of issues written concurrently
+        """
+        self.max_in_flight = max(1, max_in_flight)
+
+    @staticmethod
+    def _run_chain(
+        key: str, operations: List[JiraOperation]
+    ) -> List[JiraOperationResult]:
+        """
+        Executes the operations of a single issue in order. Once an operation
+        failed, the remaining operations of the issue are skipped.
+
+        :param key: `str` key identifying the issue, e.g. the package key
+        :param operations: `List` of the operations of the issue
+        :return: `List` containing a `JiraOperationResult` per operation
+        """
+        results = list()
+        previous = None
+        failed = False
+        for name, operation in operations:
+            if failed:
+                results.append(JiraOperationResult(key, name, skipped=True))
+                continue
+            try:
+                previous = operation(previous)
+                results.append(JiraOperationResult(key, name, previous))
+            except Exception as e:
+                logger.error(f"Could not {name} jira issue of {key}: {e}")
+                results.append(JiraOperationResult(key, name, error=e))
+                failed = True
+        return results
+
+    def run(
+        self, operations: Dict[str, List[JiraOperation]]
+    ) -> List[JiraOperationResult]:
+        """
+        Executes the operations of all issues.
+
+        :param operations: `Dict` mapping the key of every issue to the
+        `List` of its operations
+        :return: `List` containing a `JiraOperationResult` per operation, in the
+        order the issues and operations were given, independent of the order
+        they were executed in
+        """
+        if self.max_in_flight == 1:
+            chains = [
+                self._run_chain(key, chain) for key, chain in operations.items()
+            ]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+                futures = [
+                    executor.submit(self._run_chain, key, chain)
+                    for key, chain in operations.items()
+                ]
+                chains = [future.result() for future in futures]
+
+        return [result for chain in chains for result in chain]
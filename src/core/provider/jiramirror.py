@@ -0,0 +1,128 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:03
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.utils import fastjson, logger as log
+
+logger = log.get_logger(__file__)
+
+
+class JiraIssueMirror:
+    """
+    Persistent local copy of the issues of a jira project. Every issue is
+    stored as the JSON jira returned for it, such that it can be converted
+    into a `Package` again without asking jira. Besides the issues, the mirror keeps
+    a few values describing the state of the synchronisation, e.g. when it
+    was last synchronised.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens or creates the SQLite mirror at the given path.
+
+        :param path: `str` path of the SQLite database file
+        """
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS issues ("
+            "key TEXT PRIMARY KEY, id INTEGER, raw TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value TEXT)"
+        )
+
+    def __enter__(self) -> JiraIssueMirror:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self._db.commit()
+        self.close()
+
+    def close(self):
+        """
+        Closes the connection to the mirror.
+        """
+        self._db.close()
+
+    def get_state(self, name: str) -> Optional[str]:
+        """
+        :param name: `str` name of the value
+        :return: `str` the stored value or None if it was never set
+        """
+        row = self._db.execute(
+            "SELECT value FROM state WHERE name=?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, name: str, value: str):
+        """
+        :param name: `str` name of the value
+        :param value: `str` the value to store
+        """
+        self._db.execute(
+            "INSERT OR REPLACE INTO state VALUES (?, ?)", (name, value)
+        )
+
+    def issues(self, batch_size: int = 500) -> Iterator[List[Dict]]:
+        """
+        :param batch_size: `int` number of issues per batch
+        :return: `Iterator` of batches of the JSON of all mirrored issues,
+        ordered by their id
+        """
+        cursor = self._db.execute("SELECT raw FROM issues ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [fastjson.loads(raw) for (raw,) in rows]
+
+    def put(self, issues: Iterable[Dict]):
+        """
+        Adds or replaces issues in the mirror.
+
+        :param issues: `Iterable` of the JSON of the issues as returned by jira
+        """
+        self._db.executemany(
+            "INSERT OR REPLACE INTO issues VALUES (?, ?, ?)",
+            (
+                (issue["key"], int(issue["id"]), json.dumps(issue))
+                for issue in issues
+            ),
+        )
+
+    def replace(self, issues: Iterable[Dict]):
+        """
+        Replaces all mirrored issues and the state of the synchronisation.
+
+        :param issues: `Iterable` of the JSON of the issues as returned by jira
+        """
+        self._db.execute("DELETE FROM issues")
+        self._db.execute("DELETE FROM state")
+        self.put(issues)
+
+    def prune(self, keys: Iterable[str]):
+        """
+        Removes all issues from the mirror which do not exist in jira anymore.
+
+        :param keys: `Iterable` of the keys of all issues which exist in jira
+        """
+        keys = set(keys)
+        stale = [
+            (key,)
+            for (key,) in self._db.execute("SELECT key FROM issues")
+            if key not in keys
+        ]
+        if stale:
+            logger.debug(f"Removing {len(stale)} deleted issues from mirror.")
+            self._db.executemany("DELETE FROM issues WHERE key=?", stale)
@@ -8,14 +8,41 @@
 from __future__ import annotations
 
 import copy
+import json
+import math
+import time
+from contextlib import nullcontext
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
+from functools import lru_cache
+from itertools import chain
+from typing import (
+    Any,
+    Callable,
+    List,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import requests
-from jira import JIRA, Issue
+from jira import JIRA, JIRAError, Issue
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from src.core.base_classes import Provider, Package
-from src.utils import logger as log
+from src.core.provider.jiraexecutor import (
+    JiraOperation,
+    JiraOperationResult,
+    JiraWriteExecutor,
+)
+from src.core.provider.jiramirror import JiraIssueMirror
+from src.core.provider.jiratransitions import JiraTransitionCache
+from src.utils import fastjson, logger as log
 from src.utils.config import (
     PackageState,
     JiraLane,
@@ -25,10 +52,31 @@ from src.utils.config import (
 )
 from src.utils.config import conf
 from src.utils.exceptions import JiraIssueMissingFields
+from src.utils.ratelimit import RequestScheduler, status_code
 
 logger = log.get_logger(__file__)
 
 
+@lru_cache(maxsize=None)
+def _parse_date(value: str) -> datetime:
+    """
+    Parses a due date of jira. As most issues share a few due dates, e.g. the
+    promotion days, the parsed dates are cached.
+
+    :param value: `str` the date in the format ``YYYY-MM-DD``
+    :return: `datetime` of the date
+    """
+    return datetime.strptime(value, "%Y-%m-%d")
+
+
+# Maximum number of issues jira creates with a single bulk create request.
+BULK_CREATE_SIZE = 50
+
+# Minutes added to the time since the last synchronisation of the mirror, such
+# that issues updated while it was running are not missed.
+SYNC_OVERLAP_MINUTES = 5
+
+
 class JiraBoardProvider(Provider):
     """
     Connects to a specific jira server and represents the state of the issues
@@ -48,19 +96,79 @@ class JiraBoardProvider(Provider):
         super().__init__(name, dry_run)
         # noinspection PyTypeChecker
         self._jira = None  # type: JIRA
+        # the lane and comparable field values of the loaded issues by their
+        # key, such that they do not need to be searched again when committing
+        # while the JSON of the issues is dropped after each page
+        self._issues = dict()  # type: Dict[str, Dict]
+        # results of the operations executed by the last commit
+        self.commit_results: List[JiraOperationResult] = list()
+        # the search endpoint and seconds of the HTTP call of every search
+        self.search_timings: List[Tuple[str, float]] = list()
+        # the search endpoint and seconds every search spent apart from its
+        # HTTP call, i.e. waiting in the scheduler and for retries
+        self.search_waits: List[Tuple[str, float]] = list()
+        # whether searches are paginated by token, None until it is known if
+        # jira offers the enhanced search
+        self._token_pagination = {"token": True, "offset": False}.get(
+            conf.JIRA_SEARCH_PAGINATION
+        )
+        # every request to jira is sent through the scheduler, which keeps
+        # the requests within the rate limits of the server
+        self._scheduler = RequestScheduler(
+            rate=conf.JIRA_REQUESTS_PER_SECOND,
+            max_concurrency=max(
+                conf.JIRA_LOAD_WORKERS, conf.JIRA_WRITE_WORKERS
+            ),
+            max_retries=conf.JIRA_MAX_RETRIES,
+            target_latency=conf.JIRA_TARGET_LATENCY,
+        )
+        self._transitions = JiraTransitionCache(
+            conf.JIRA_TRANSITIONS_CACHE_PATH
+        )
+
+    def _request(
+        self, function: Callable, *args, idempotent: bool = True, **kwargs
+    ) -> Any:
+        """
+        Sends a request to jira through the request scheduler.
+
+        :param function: `Callable` of the jira client sending the request
+        :param idempotent: False if the request must not be repeated after a
+        server error, e.g. because it creates issues
+        :return: the return value of the function
+        """
+        return self._scheduler.call(
+            function, *args, idempotent=idempotent, **kwargs
+        )
 
     def connect(self, connection_params=conf.JIRA_CONNECTION_INFO):
         """
         Connects to a jira instance by using the configured connection
-        information
+        information. Once connected, the client and its session are reused by
+        all following requests, e.g. for loading and committing, such that
+        their connections are kept alive.
 
         :param connection_params: Parameters to connect to the jira api, if no
         explicit parameters a given it will use
         the values defined in the config.py file
         :return: `bool` True if the connection was successful
         """
+        if self._jira is not None:
+            return True
+
         try:
-            self._jira = JIRA(**connection_params)
+            # retries of responses are handled by the request scheduler
+            self._jira = JIRA(
+                **{
+                    "max_retries": 0,
+                    "timeout": (
+                        conf.JIRA_CONNECT_TIMEOUT,
+                        conf.JIRA_READ_TIMEOUT,
+                    ),
+                    **connection_params,
+                }
+            )
+            self._configure_session(self._jira._session)
 
             if self._jira:
                 logger.debug("Successfully connected to Jira instance.")
@@ -72,42 +180,399 @@ class JiraBoardProvider(Provider):
             )
             return False
 
+    @staticmethod
+    def _configure_session(session: requests.Session):
+        """
+        Tunes the HTTP session of the jira client. The connection pool is
+        sized to `conf.JIRA_POOL_SIZE`, as the default pool of 10 connections
+        is too small for the concurrent loading and writing of issues. Failed
+        connection attempts are retried `conf.JIRA_TRANSPORT_RETRIES` times,
+        which is safe for every request as it was not sent yet. Failed or
+        throttled responses are left to the request scheduler. Responses are
+        requested gzip compressed on kept alive connections.
+
+        :param session: `requests.Session` of the jira client
+        """
+        retries = Retry(
+            total=conf.JIRA_TRANSPORT_RETRIES,
+            connect=conf.JIRA_TRANSPORT_RETRIES,
+            read=0,
+            status=0,
+            backoff_factor=0.5,
+            # throttled responses are retried by the request scheduler
+            respect_retry_after_header=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=conf.JIRA_POOL_SIZE,
+            pool_maxsize=conf.JIRA_POOL_SIZE,
+            max_retries=retries,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(
+            {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+        )
+
     def load(self):
         """
         If a successful connection to the jira instance is possible all issues
-        for a given project key are loaded.
+        for a given project key are loaded, see :func:`iter_packages`.
+        """
+        for _ in self.iter_packages():
+            pass
+
+    def iter_packages(self) -> Iterator[Package]:
+        """
+        Loads all issues for a given project key and yields their packages
+        while they are loaded, such that they can be processed before the whole
+        board arrived.
         Issues are loaded in batches, if the project has more issues than the
-        batch size, the issues are loaded continuously.
-        After loading the issues, these are converted into a `Package` with
-        :func:`_jira_issue_to_package_dict`
-        """
-        if self.is_loaded or self.connect():
-            query = f"project={conf.JIRA_PROJECT_KEY}"
-            search_result = self._jira.search_issues(query, maxResults=500)
-            total_issues = search_result.total
-            self.is_loaded = True
-
-            if total_issues != len(search_result):
-                # we could only fetch some tickets and need to fetch more
-                logger.debug("Fetching remaining Jira Tickets.")
-                cumulative_results = list()
-
-                while len(cumulative_results) != total_issues:
-                    cumulative_results.extend(search_result.iterable)
-                    start_at = search_result.startAt + len(search_result)
-                    search_result.clear()
-                    search_result = self._jira.search_issues(
-                        query, startAt=start_at, maxResults=500
+        batch size, the remaining batches are loaded concurrently by
+        `conf.JIRA_LOAD_WORKERS` workers once the first batch revealed the
+        total number of issues.
+        If `conf.JIRA_MIRROR_PATH` is set, the issues are synchronised with a
+        local mirror instead, see :func:`_sync_mirror`.
+        Every batch is converted into packages with
+        :func:`_jira_issue_to_package_dict` as soon as it arrived. Once all
+        packages were yielded, they are available through :func:`get` as well.
+
+        :return: `Iterator` of the `Package` of every issue
+        """
+        if not (self.is_loaded or self.connect()):
+            return
+
+        self.is_loaded = True
+        self._issues.clear()
+        self._packages_dict = dict()
+
+        with self._open_mirror() as mirror:
+            if mirror is None:
+                batches = self._search_batches(self._project_query())
+            else:
+                batches = self._sync_mirror(mirror)
+
+            for batch in batches:
+                packages = self._jira_issue_to_package_dict(batch)
+                self._packages_dict.update(packages)
+                yield from packages.values()
+
+    @staticmethod
+    def _project_query(condition: str = "") -> str:
+        """
+        :param condition: `str` optional JQL condition the issues need to meet
+        :return: `str` JQL query for the issues of the project, ordered such
+        that the batches of the search do not overlap
+        """
+        condition = f" AND {condition}" if condition else ""
+        return f"project={conf.JIRA_PROJECT_KEY}{condition} ORDER BY key ASC"
+
+    @staticmethod
+    def _open_mirror():
+        """
+        Opens the issue mirror configured in `conf.JIRA_MIRROR_PATH`.
+
+        :return: `JiraIssueMirror` or a context returning None if no mirror is
+        configured
+        """
+        if conf.JIRA_MIRROR_PATH:
+            return JiraIssueMirror(conf.JIRA_MIRROR_PATH)
+        return nullcontext()
+
+    def _sync_mirror(self, mirror: JiraIssueMirror) -> Iterator[List[Dict]]:
+        """
+        Synchronises the mirror with jira and returns the mirrored issues.
+        On the first run, or if the project or the requested fields changed,
+        all issues are loaded. Afterwards only the issues updated since the
+        last synchronisation are loaded and merged into the mirror.
+        Deleted issues do not show up in these searches, therefore the keys of
+        all issues are compared with the mirror every
+        `conf.JIRA_MIRROR_RECONCILE_INTERVAL` hours.
+
+        :param mirror: `JiraIssueMirror` to synchronise
+        :return: `Iterator` of batches of the JSON of all mirrored issues
+        """
+        now = time.time()
+        signature = json.dumps([conf.JIRA_PROJECT_KEY, self._search_fields()])
+        synced_at = mirror.get_state("synced_at")
+
+        if synced_at is None or mirror.get_state("signature") != signature:
+            logger.debug("Loading all Jira issues into the mirror.")
+            mirror.replace(
+                chain.from_iterable(self._search_batches(self._project_query()))
+            )
+            mirror.set_state("signature", signature)
+            mirror.set_state("reconciled_at", str(now))
+        else:
+            # the minutes are relative to the time of the jira server, which
+            # avoids any time zone or clock differences between the two
+            minutes = (
+                math.ceil((now - float(synced_at)) / 60) + SYNC_OVERLAP_MINUTES
+            )
+            changed = self._search_all(
+                self._project_query(f"updated >= -{minutes}m")
+            )
+            logger.debug(f"Merging {len(changed)} changed Jira issues.")
+            mirror.put(changed)
+
+            reconciled_at = float(mirror.get_state("reconciled_at") or 0)
+            if (
+                now - reconciled_at
+                >= conf.JIRA_MIRROR_RECONCILE_INTERVAL * 3600
+            ):
+                logger.debug("Reconciling the Jira issue mirror.")
+                mirror.prune(
+                    issue.get("key")
+                    for issue in self._search_all(
+                        self._project_query(), fields="key"
                     )
-                self._packages_dict = self._jira_issue_to_package_dict(
-                    cumulative_results
                 )
-                return
+                mirror.set_state("reconciled_at", str(now))
+
+        mirror.set_state("synced_at", str(now))
+        return mirror.issues()
+
+    def _get_search(self, path: str, params: Dict) -> Dict:
+        """
+        Sends a search request and returns the JSON of the response. Instead of
+        converting the response into `Issue` resources like
+        `JIRA.search_issues`, the JSON of the issues is returned as it is,
+        decoded with :func:`src.utils.fastjson.loads`. The time of the HTTP
+        call which answered the search is added to `search_timings`, the time
+        spent waiting for the scheduler, throttling and failed attempts before
+        is added to `search_waits`.
+
+        :param path: `str` path of the search endpoint of the REST API
+        :param params: `Dict` query parameters of the search
+        :return: `Dict` the JSON response of jira
+        """
+        attempts = list()
 
-            self._packages_dict = self._jira_issue_to_package_dict(
-                search_result
+        def get(*args, **kwargs):
+            start_attempt = time.perf_counter()
+            try:
+                return self._jira._session.get(*args, **kwargs)
+            finally:
+                attempts.append(time.perf_counter() - start_attempt)
+
+        start = time.perf_counter()
+        response = self._request(get, self._jira._get_url(path), params=params)
+        elapsed = attempts[-1]
+        waited = time.perf_counter() - start - elapsed
+        result = fastjson.loads(response.content)
+
+        self.search_timings.append((path, elapsed))
+        self.search_waits.append((path, waited))
+        logger.debug(
+            f"Loaded {len(result.get('issues') or [])} Jira issues from "
+            f"{path} in {elapsed:.3f} seconds after waiting {waited:.3f} "
+            f"seconds."
+        )
+        return result
+
+    def _search(
+        self,
+        query: str,
+        start_at: int = 0,
+        max_results: int = 500,
+        fields: Optional[str] = None,
+    ) -> Dict:
+        """
+        Loads a single batch of issues of a search paginated by offset.
+
+        :param query: `str` the JQL query of the search
+        :param start_at: `int` index of the first issue of the batch
+        :param max_results: `int` maximum number of issues of the batch
+        :param fields: `str` comma separated fields to load, defaults to the
+        fields of :func:`_search_fields`
+        :return: `Dict` the JSON response of jira, containing the ``issues``
+        and the ``total`` number of issues of the search
+        """
+        return self._get_search(
+            "search",
+            {
+                "jql": query,
+                "startAt": start_at,
+                "maxResults": max_results,
+                "fields": fields or self._search_fields(),
+            },
+        )
+
+    def _search_jql(
+        self,
+        query: str,
+        next_page_token: Optional[str] = None,
+        max_results: int = 500,
+        fields: Optional[str] = None,
+    ) -> Dict:
+        """
+        Loads a single batch of issues of a search paginated by token, using
+        the enhanced search endpoint ``search/jql``.
+
+        :param query: `str` the JQL query of the search
+        :param next_page_token: `str` token of the batch returned with the
+        previous batch, None for the first batch
+        :param max_results: `int` maximum number of issues of the batch
+        :param fields: `str` comma separated fields to load, defaults to the
+        fields of :func:`_search_fields`
+        :return: `Dict` the JSON response of jira, containing the ``issues``
+        and the ``nextPageToken`` of the next batch unless it ``isLast``
+        """
+        params = {
+            "jql": query,
+            "maxResults": max_results,
+            "fields": fields or self._search_fields(),
+        }
+        if next_page_token:
+            params["nextPageToken"] = next_page_token
+        return self._get_search("search/jql", params)
+
+    def _search_all(self, query: str, fields: Optional[str] = None) -> List:
+        """
+        Loads all issues of a search, see :func:`_search_batches`.
+
+        :param query: `str` the JQL query of the search
+        :param fields: `str` comma separated fields to load, defaults to the
+        fields of :func:`_search_fields`
+        :return: `List` of the JSON of all issues of the search
+        """
+        return list(chain.from_iterable(self._search_batches(query, fields)))
+
+    def _search_batches(
+        self, query: str, fields: Optional[str] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Loads all issues of a search batch by batch. Depending on
+        `conf.JIRA_SEARCH_PAGINATION`, the batches are paginated by token, see
+        :func:`_token_batches`, or by offset, see :func:`_offset_batches`. With
+        ``auto`` pagination by token is tried first and if jira does not offer
+        the enhanced search endpoint, pagination by offset is used from then
+        on. Issues which moved between batches while loading are only yielded
+        once.
+
+        :param query: `str` the JQL query of the search
+        :param fields: `str` comma separated fields to load, defaults to the
+        fields of :func:`_search_fields`
+        :return: `Iterator` of batches of the JSON of the issues of the search
+        """
+        first_timing = len(self.search_timings)
+        first_wait = len(self.search_waits)
+        batches = None
+        if self._token_pagination is not False:
+            try:
+                first_result = self._search_jql(query, fields=fields)
+                self._token_pagination = True
+                batches = self._token_batches(query, first_result, fields)
+            except JIRAError as e:
+                if self._token_pagination or status_code(e) not in (404, 405):
+                    raise
+                logger.info(
+                    "Jira does not offer the enhanced search, falling back to "
+                    "pagination by offset."
+                )
+                self._token_pagination = False
+        if batches is None:
+            batches = self._offset_batches(query, fields)
+
+        keys = set()
+        for batch in batches:
+            batch = [issue for issue in batch if issue.get("key") not in keys]
+            keys.update(issue.get("key") for issue in batch)
+            yield batch
+
+        timings = [t for _, t in self.search_timings[first_timing:]]
+        waits = [t for _, t in self.search_waits[first_wait:]]
+        if timings:
+            logger.debug(
+                f"Searched {len(keys)} Jira issues paginated by "
+                f"{'token' if self._token_pagination else 'offset'} in "
+                f"{len(timings)} requests, {sum(timings):.3f} seconds in "
+                f"total, {sum(timings) / len(timings):.3f} seconds on average "
+                f"and {sum(waits):.3f} seconds waiting for the scheduler."
             )
 
+    def _token_batches(
+        self, query: str, first_result: Dict, fields: Optional[str]
+    ) -> Iterator[List[Dict]]:
+        """
+        Yields the batches of a search paginated by token. Every batch contains
+        the token of the next one, therefore the batches are loaded one after
+        another. In contrast to pagination by offset, the position of the next
+        batch does not shift if issues change while loading and jira does not
+        need to skip all previous issues for every batch.
+
+        :param query: `str` the JQL query of the search
+        :param first_result: `Dict` the response to the first batch
+        :param fields: `str` comma separated fields to load
+        :return: `Iterator` of batches of the JSON of the issues of the search
+        """
+        result = first_result
+        yield result.get("issues")
+        while not result.get("isLast") and result.get("nextPageToken"):
+            result = self._search_jql(
+                query, result.get("nextPageToken"), fields=fields
+            )
+            yield result.get("issues")
+
+    def _offset_batches(
+        self, query: str, fields: Optional[str]
+    ) -> Iterator[List[Dict]]:
+        """
+        Yields the batches of a search paginated by offset. The first batch is
+        loaded alone, if it does not contain all issues the offsets of the
+        remaining batches are known from the total number of issues and they
+        are loaded concurrently. The batches are yielded in the order of their
+        offsets, independent of the order they arrived in. Only a few batches
+        are loaded ahead of the one yielded last, such that a slow consumer
+        does not end up with all batches in memory.
+
+        :param query: `str` the JQL query of the search
+        :param fields: `str` comma separated fields to load
+        :return: `Iterator` of batches of the JSON of the issues of the search
+        """
+        first_result = self._search(query, fields=fields)
+        yield first_result.get("issues")
+
+        if first_result.get("total") == len(first_result.get("issues")):
+            return
+
+        # we could only fetch some tickets and need to fetch more
+        logger.debug("Fetching remaining Jira Tickets.")
+        # jira may return fewer issues per batch than requested
+        batch_size = len(first_result.get("issues")) or 500
+        offsets = range(
+            first_result.get("startAt", 0) + batch_size,
+            first_result.get("total"),
+            batch_size,
+        )
+        workers = max(1, conf.JIRA_LOAD_WORKERS)
+
+        def load_batch(start_at: int) -> List[Dict]:
+            return self._search(query, start_at, batch_size, fields)["issues"]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            try:
+                for start_at in offsets:
+                    pending.append(executor.submit(load_batch, start_at))
+                    if len(pending) > workers:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    @staticmethod
+    def _search_fields() -> str:
+        """
+        By default jira returns every field of the found issues. Only the
+        fields converted into a `Package` and the status are requested, which
+        keeps the responses small.
+
+        :return: `str` comma separated fields requested by every issue search
+        """
+        return ",".join(conf.ISSUE_FIELDS + ["status"])
+
     @staticmethod
     def check_jira_issue_exists(package: Package) -> bool:
         """
@@ -118,69 +583,79 @@ class JiraBoardProvider(Provider):
         """
         return bool(package.jira_id)
 
-    def _jira_issue_to_package_dict(self, issues: List[Issue]) -> Dict:
+    def _jira_issue_to_package_dict(self, issues: List[Dict]) -> Dict:
         """
-        Wrapper method around the :func:`_jira_issue_to_package` method which
-        handles a list of `Issue`.
+        Wrapper method around the :func:`_raw_issue_to_package` method which
+        handles a list of issues as returned by a search.
 
-        :param issues: `List` containing `Issue` to be converted to `Package`
-        objects
+        :param issues: `List` containing the JSON of the issues to be converted
+        to `Package` objects
         :return: `Dict` containing the newly created `Package` objects
         """
         packages = dict()
         for issue in issues:
-            p = self._jira_issue_to_package(issue)
+            p = self._raw_issue_to_package(issue)
             packages.update({p.key: p})
+            self._issues.update({p.jira_id: self._issue_state(issue)})
 
         return packages
 
-    def _jira_issue_to_package(self, issue: Issue) -> Package:
+    @staticmethod
+    def _raw_issue_to_package(issue: Dict) -> Package:
         """
-        Converts a given issue into a `Package` object. Before converting the
-        issue is verified to contain
-        all needed fields. In case the package is missing certain fields defined
-        in `conf.ISSUE_FIELDS`,
-        `JiraIssueMissingFields` is raised.
+        Converts the JSON of an issue into a `Package` object. Working on the
+        JSON directly avoids building the resource objects of the jira library.
+        In case the issue is missing certain fields defined in
+        `conf.ISSUE_FIELDS`, `JiraIssueMissingFields` is raised.
 
-        :param issue: The jira issue converted to a `Package`
+        :param issue: `Dict` the JSON of the issue as returned by jira
         :return: `Package` representing the issue
         """
-        fields_dict = issue.fields.__dict__  # type: dict
+        fields_dict = issue.get("fields") or dict()
+
+        if not all(field in fields_dict for field in conf.ISSUE_FIELDS):
+            raise JiraIssueMissingFields()
 
-        if all(field in fields_dict for field in conf.ISSUE_FIELDS):
-            # Before we try to get all fields from our issue we check, whether
-            # all fields are present as keys
+        present = fields_dict.get(conf.JIRA_PRESENT_FIELD)
+        return Package(
+            name=fields_dict.get(conf.JIRA_SOFTWARE_NAME_FIELD),
+            version=Package.str_to_version(
+                fields_dict.get(conf.JIRA_SOFTWARE_VERSION_FIELD)
+            ),
+            catalog=Catalog(fields_dict.get(conf.JIRA_CATALOG_FIELD)["id"]),
+            promote_date=_parse_date(fields_dict.get(conf.JIRA_DUEDATE_FIELD)),
+            is_autopromote=JiraAutopromote(
+                fields_dict.get(conf.JIRA_AUTOPROMOTE_FIELD)["id"]
+            ),
+            is_present=Present(present[0]["id"] if present else None),
+            provider=JiraBoardProvider,
+            jira_id=issue.get("key"),
+            jira_lane=JiraLane(fields_dict.get("status")["name"]),
+            state=PackageState.DEFAULT,
+            munki_uuid=None,
+        )
 
-            if fields_dict.get(conf.JIRA_PRESENT_FIELD):
-                is_present = Present(
-                    fields_dict.get(conf.JIRA_PRESENT_FIELD)[0].id
-                )
-            else:
-                is_present = Present(None)
-
-            p = Package(
-                name=fields_dict.get(conf.JIRA_SOFTWARE_NAME_FIELD),
-                version=Package.str_to_version(
-                    fields_dict.get(conf.JIRA_SOFTWARE_VERSION_FIELD)
-                ),
-                catalog=Catalog(fields_dict.get(conf.JIRA_CATALOG_FIELD).id),
-                promote_date=datetime.strptime(
-                    fields_dict.get(conf.JIRA_DUEDATE_FIELD), "%Y-%m-%d"
-                ),
-                is_autopromote=JiraAutopromote(
-                    fields_dict.get(conf.JIRA_AUTOPROMOTE_FIELD).id
-                ),
-                is_present=is_present,
-                provider=JiraBoardProvider,
-                jira_id=issue.key,
-                jira_lane=JiraLane(fields_dict.get("status").name),
-                state=PackageState.DEFAULT,
-                munki_uuid=None,
-            )
+    @staticmethod
+    def _issue_state(issue: Dict) -> Dict:
+        """
+        Extracts what :func:`_changed_fields` and :func:`_package_operations`
+        need to know of a loaded issue, i.e. its lane and the comparable values
+        of the fields in `conf.ISSUE_FIELDS`, so the JSON of the issue can be
+        dropped.
 
-            return p
-        else:
-            raise JiraIssueMissingFields()
+        :param issue: `Dict` the JSON of the issue as returned by jira
+        :return: `Dict` with the `JiraLane` of the issue as ``lane`` and the
+        values of its fields as ``fields``
+        """
+        fields_dict = issue.get("fields") or dict()
+        return {
+            "lane": JiraLane(fields_dict.get("status")["name"]),
+            "fields": {
+                name: JiraBoardProvider._field_value(fields_dict.get(name))
+                for name in conf.ISSUE_FIELDS
+                if name in fields_dict
+            },
+        }
 
     def update(self, package: Package):
         """
@@ -223,73 +698,471 @@ class JiraBoardProvider(Provider):
                 logger.debug(f"Creating new jira ticket for {package}")
                 self._packages_dict.update({package.key: package})
 
+    def _refresh_issues(self, keys: Iterable[str]):
+        """
+        Fetches the issues with the given keys which were not loaded before,
+        e.g. because they were created in the meantime. Instead of one request
+        per issue, the issues are searched in batches with a single
+        ``key in (...)`` query each.
+
+        :param keys: `Iterable` of the keys of the issues to fetch
+        """
+        keys = sorted(set(keys))
+        for start in range(0, len(keys), 100):
+            batch = keys[start : start + 100]
+            logger.debug(f"Fetching {len(batch)} issues not loaded before.")
+            for issue in self._search_all(
+                f"project={conf.JIRA_PROJECT_KEY} AND "
+                f"key in ({', '.join(batch)})"
+            ):
+                self._issues.update(
+                    {issue.get("key"): self._issue_state(issue)}
+                )
+
+    def _update_issue(self, key: str, fields: Dict):
+        """
+        Updates the fields of an issue directly by its key. Compared to
+        `Issue.update` this neither requires an `Issue` object nor reloads the
+        issue after the update, which saves a request per issue.
+
+        :param key: `str` key of the issue to update
+        :param fields: `Dict` of the fields to set
+        """
+        self._request(
+            self._jira._session.put,
+            self._jira._get_url(f"issue/{key}"),
+            data=json.dumps({"fields": fields}),
+        )
+
+    @staticmethod
+    def _workflow() -> str:
+        """
+        :return: `str` identifying the workflow of the issues, which is
+        determined by the project and the issue type
+        """
+        return f"{conf.JIRA_PROJECT_KEY}/{conf.JIRA_ISSUE_TYPE}"
+
+    def _transition_id(self, issue: Union[Issue, str], name: str) -> str:
+        """
+        Resolves the name of a transition into its id. The ids are cached per
+        workflow, only if a name is not cached yet the transitions available on
+        the issue are requested.
+
+        :param issue: `Issue` or `str` key of the issue to transition
+        :param name: `str` name of the transition
+        :return: `str` id of the transition
+        """
+        workflow = self._workflow()
+        with self._transitions.lock:
+            transition_id = self._transitions.get(workflow, name)
+            if transition_id is None:
+                logger.debug(f"Looking up the id of transition {name}.")
+                self._transitions.update(
+                    workflow,
+                    self._request(
+                        self._jira.transitions,
+                        issue,
+                        expand="transitions.fields",
+                    ),
+                )
+                transition_id = self._transitions.get(workflow, name)
+
+        if transition_id is None:
+            raise JIRAError(f"Invalid transition name. {name}")
+        return transition_id
+
+    def _transition_issue(
+        self,
+        issue: Union[Issue, str],
+        name: str,
+        fields: Optional[Dict] = None,
+    ):
+        """
+        Transitions an issue by the cached id of the transition. If jira
+        rejects a cached id, e.g. because the workflow was changed, the cached
+        transitions of the workflow are dropped and the id is looked up again.
+        Other errors, like an invalid field value, are raised at once.
+
+        :param issue: `Issue` or `str` key of the issue to transition
+        :param name: `str` name of the transition
+        :param fields: `Dict` of fields to set together with the transition
+        """
+        cached = self._transitions.get(self._workflow(), name) is not None
+        try:
+            self._send_transition(issue, name, fields)
+        except JIRAError as e:
+            if (
+                not cached
+                or e.status_code != 400
+                or not self._rejects_transition(e)
+            ):
+                raise
+            logger.debug(f"Cached id of transition {name} is not valid.")
+            self._transitions.invalidate(self._workflow())
+            self._send_transition(issue, name, fields)
+
+    @staticmethod
+    def _rejects_transition(error: JIRAError) -> bool:
+        """
+        Checks whether jira rejected the transition itself, as opposed to e.g.
+        the value of a field or a validator of the workflow, which are
+        reported with the same status code.
+
+        :param error: `JIRAError` raised by a transition request
+        :return: True if the errors of the response name the transition
+        """
+        try:
+            body = error.response.json()
+        except (AttributeError, ValueError):
+            body = None
+
+        if isinstance(body, dict):
+            messages = list(body.get("errorMessages") or list())
+            messages.extend(
+                f"{field}: {message}"
+                for field, message in (body.get("errors") or dict()).items()
+            )
+        else:
+            messages = [error.text or ""]
+        # jira server reports an unknown transition id as invalid workflow
+        # operation without naming the transition
+        return any(
+            "transition" in str(message).lower()
+            or "workflow operation" in str(message).lower()
+            for message in messages
+        )
+
+    def _send_transition(
+        self, issue: Union[Issue, str], name: str, fields: Optional[Dict]
+    ):
+        """
+        Sends the request transitioning an issue. Fields are set within the
+        same request if all of them are on the screen of the transition,
+        otherwise they are updated with a separate request beforehand.
+
+        :param issue: `Issue` or `str` key of the issue to transition
+        :param name: `str` name of the transition
+        :param fields: `Dict` of fields to set together with the transition
+        """
+        transition_id = self._transition_id(issue, name)
+        params = dict()
+        if fields:
+            if self._transitions.allows_fields(self._workflow(), name, fields):
+                params.update({"fields": fields})
+            else:
+                self._update_issue(getattr(issue, "key", issue), fields)
+
+        # a repeated transition would fail, as the issue already moved on
+        self._request(
+            self._jira.transition_issue,
+            issue,
+            transition_id,
+            idempotent=False,
+            **params,
+        )
+
+    @staticmethod
+    def _field_value(value: Any) -> Any:
+        """
+        Converts the value of a field into a form which can be compared,
+        independent of whether it was loaded from jira or will be sent to it.
+        Options like the catalog are only compared by their id.
+
+        :param value: value of the field
+        :return: the comparable value
+        """
+        if isinstance(value, dict):
+            option_id = value.get("id")
+            return None if option_id is None else str(option_id)
+        if isinstance(value, list):
+            values = (JiraBoardProvider._field_value(v) for v in value)
+            return [v for v in values if v is not None]
+        return value
+
+    def _changed_fields(self, issue: Optional[Dict], fields: Dict) -> Dict:
+        """
+        Compares the fields which would be sent to jira with the fields of the
+        loaded issue.
+
+        :param issue: `Dict` the state of the loaded issue as returned by
+        :func:`_issue_state`, if it is not known all fields are considered
+        changed
+        :param fields: `Dict` of the fields to set
+        :return: `Dict` containing only the fields whose value changed
+        """
+        current = (issue or dict()).get("fields") or dict()
+
+        changed = dict()
+        for name, value in fields.items():
+            if name not in current:
+                changed.update({name: value})
+                continue
+            new_value = self._field_value(value)
+            current_value = self._field_value(current.get(name))
+            if isinstance(new_value, list) and current_value is None:
+                # jira returns empty multi selects as null
+                current_value = list()
+            if new_value != current_value:
+                changed.update({name: value})
+        return changed
+
+    @staticmethod
+    def _issue_fields(package: Package) -> Dict:
+        """
+        :param package: `Package` to write to jira
+        :return: `Dict` of the fields of the issue representing the package,
+        including the fields required to create it if the package is new
+        """
+        issue_dict = {
+            conf.JIRA_SOFTWARE_NAME_FIELD: package.name,
+            conf.JIRA_SOFTWARE_VERSION_FIELD: str(package.version),
+            conf.JIRA_DUEDATE_FIELD: package.promote_date.strftime("%Y-%m-%d"),
+            conf.JIRA_DESCRIPTION_FIELD: package.name,
+            conf.JIRA_CATALOG_FIELD: package.catalog.to_jira_rest_dict(),
+            conf.JIRA_AUTOPROMOTE_FIELD: package.is_autopromote.to_jira_rest_dict(),  # noqa: B950
+            conf.JIRA_PRESENT_FIELD: [package.is_present.to_jira_rest_dict()],
+        }
+
+        if package.state == PackageState.NEW:
+            # Add the required fields we need to create a new ticket compared
+            # to an update call. The REST API expects the project and issue
+            # type as objects, which the jira library used to build for us.
+            issue_dict.update(
+                {
+                    conf.JIRA_PROJECT_FIELD: {"key": conf.JIRA_PROJECT_KEY},
+                    conf.JIRA_ISSUE_TYPE_FIELD: {"name": conf.JIRA_ISSUE_TYPE},
+                    conf.JIRA_SUMMARY_FIELD: package.key,
+                }
+            )
+        return issue_dict
+
+    @staticmethod
+    def _bulk_create_results(
+        packages: List[Package], response: Dict
+    ) -> List[JiraOperationResult]:
+        """
+        Maps the response of a bulk create back to the packages. Jira lists
+        the created issues in the order they were requested and reports the
+        index of every issue which could not be created.
+
+        :param packages: `List` of the packages in the order they were sent
+        :param response: `Dict` the JSON response of jira
+        :return: `List` containing a `JiraOperationResult` per package with the
+        key of the created issue or the error
+        """
+        errors = {
+            error.get("failedElementNumber"): error
+            for error in response.get("errors") or list()
+        }
+        created = iter(response.get("issues") or list())
+
+        results = list()
+        for number, package in enumerate(packages):
+            error = errors.get(number)
+            if error:
+                results.append(
+                    JiraOperationResult(
+                        package.key,
+                        "create",
+                        error=JIRAError(
+                            status_code=error.get("status"),
+                            text=json.dumps(error.get("elementErrors")),
+                        ),
+                    )
+                )
+                continue
+            issue = next(created, None)
+            if issue is None:
+                results.append(
+                    JiraOperationResult(
+                        package.key,
+                        "create",
+                        error=JIRAError(text="Issue missing in response."),
+                    )
+                )
+                continue
+            results.append(
+                JiraOperationResult(package.key, "create", issue.get("key"))
+            )
+        return results
+
+    def _create_issues(
+        self, packages: List[Package]
+    ) -> List[JiraOperationResult]:
+        """
+        Creates the issues of new packages with jira's bulk create, which
+        creates up to `BULK_CREATE_SIZE` issues with a single request. An
+        issue which can not be created does not prevent the others from being
+        created.
+
+        :param packages: `List` of the new packages
+        :return: `List` containing a `JiraOperationResult` per package with the
+        key of the created issue or the error
+        """
+        results = list()
+        for start in range(0, len(packages), BULK_CREATE_SIZE):
+            batch = packages[start : start + BULK_CREATE_SIZE]
+            logger.debug(f"Creating {len(batch)} new tickets.")
+            data = json.dumps(
+                {
+                    "issueUpdates": [
+                        {"fields": self._issue_fields(package)}
+                        for package in batch
+                    ]
+                }
+            )
+            try:
+                # a repeated bulk create would create the issues twice
+                response = self._request(
+                    self._jira._session.post,
+                    self._jira._get_url("issue/bulk"),
+                    data=data,
+                    idempotent=False,
+                )
+                results.extend(
+                    self._bulk_create_results(batch, json.loads(response.text))
+                )
+            except Exception as e:
+                # if no issue could be created at all, jira answers with an
+                # error but still reports the errors of every issue
+                try:
+                    response = json.loads(e.response.text)
+                except (AttributeError, TypeError, ValueError):
+                    response = None
+                if isinstance(response, dict) and response.get("errors"):
+                    results.extend(self._bulk_create_results(batch, response))
+                else:
+                    results.extend(
+                        JiraOperationResult(package.key, "create", error=e)
+                        for package in batch
+                    )
+
+        for result in results:
+            if result.ok:
+                logger.debug(f"Created ticket {result.result}.")
+            else:
+                logger.error(
+                    f"Could not create jira issue of {result.key}: "
+                    f"{result.error}"
+                )
+        return results
+
+    def _package_operations(self, package: Package) -> List[JiraOperation]:
+        """
+        Creates the operations needed to write a package to jira. Packages
+        whose issue was just created are transitioned if the issue is not in
+        the lane of the package, existing ones are updated and transitioned.
+
+        :param package: `Package` to write to jira
+        :return: `List` of the operations in the order they need to be executed
+        """
+        if package.state == PackageState.NEW:
+            created_ticket = self._issues.get(package.jira_id)
+
+            def transition_created(_previous):
+                self._transition_issue(
+                    package.jira_id, package.catalog.transition_id
+                )
+
+            if (
+                created_ticket is None
+                or package.jira_lane != created_ticket["lane"]
+            ):
+                return [("transition", transition_created)]
+            return list()
+
+        elif package.state == PackageState.UPDATE:
+            issue_dict = self._issue_fields(package)
+            existing_ticket = self._issues.get(package.jira_id)
+            changed_fields = self._changed_fields(existing_ticket, issue_dict)
+
+            # if the issue could not be fetched its lane is unknown, therefore
+            # all fields are sent and it is transitioned
+            current_ticket_lane = (
+                existing_ticket["lane"] if existing_ticket else None
+            )
+
+            def update(_previous):
+                logger.debug(
+                    f"Updating {', '.join(changed_fields)} of ticket for "
+                    f"package {package}"
+                )
+                self._update_issue(package.jira_id, changed_fields)
+
+            def transition(_previous):
+                # the changed fields are set by the transition if possible
+                self._transition_issue(
+                    package.jira_id,
+                    package.catalog.transition_id,
+                    fields=changed_fields,
+                )
+
+            if current_ticket_lane != package.jira_lane:
+                return [("transition", transition)]
+            if changed_fields:
+                return [("update", update)]
+            logger.debug(f"No fields of ticket for {package} changed.")
+            return list()
+
+        return list()
+
     def commit(self) -> bool:
         """
         Checks if the program runs as a dry run and if this is not the case, all
         previously made changes
         are committed to jira.
+        New issues are created in bulk first, afterwards the issues are
+        updated and transitioned concurrently by a `JiraWriteExecutor`, at most
+        `conf.JIRA_WRITE_WORKERS` at the same time. Issues which could not be
+        created are not transitioned. The result of every operation is stored
+        in `commit_results`.
         :return: `bool` True if the run was not a dry run and changes were
         committed.
         """
         if not self._dry_run:
-            for package in self.get().values():
+            new_packages = [
+                package
+                for package in self.get().values()
+                if package.state == PackageState.NEW
+            ]
+            create_results = self._create_issues(new_packages)
+            created = {
+                result.key: result.result
+                for result in create_results
+                if result.ok
+            }
+            for package in new_packages:
+                package.jira_id = created.get(package.key)
 
-                issue_dict = {
-                    conf.JIRA_SOFTWARE_NAME_FIELD: package.name,
-                    conf.JIRA_SOFTWARE_VERSION_FIELD: str(package.version),
-                    conf.JIRA_DUEDATE_FIELD: package.promote_date.strftime(
-                        "%Y-%m-%d"
-                    ),
-                    conf.JIRA_DESCRIPTION_FIELD: package.name,
-                    conf.JIRA_CATALOG_FIELD: package.catalog.to_jira_rest_dict(),
-                    conf.JIRA_AUTOPROMOTE_FIELD: package.is_autopromote.to_jira_rest_dict(),  # noqa: B950
-                    conf.JIRA_PRESENT_FIELD: [
-                        package.is_present.to_jira_rest_dict()
-                    ],
-                }
-
-                if package.state == PackageState.NEW:
-                    # Create a new ticket.
-                    # Add the required fields we need to create a new ticket
-                    # compared to an update call.
-                    issue_dict.update(
-                        {
-                            conf.JIRA_PROJECT_FIELD: conf.JIRA_PROJECT_KEY,
-                            conf.JIRA_ISSUE_TYPE_FIELD: conf.JIRA_ISSUE_TYPE,
-                            conf.JIRA_SUMMARY_FIELD: package.key,
-                        }
-                    )
+            # the created issues are fetched together with the issues which
+            # were not loaded, e.g. to know their status
+            self._refresh_issues(
+                package.jira_id
+                for package in self.get().values()
+                if package.jira_id
+                and package.jira_id not in self._issues
+                and (
+                    package.state == PackageState.UPDATE
+                    or package.key in created
+                )
+            )
 
-                    logger.debug(f"Creating new ticket for package {package}")
+            operations = {
+                key: self._package_operations(package)
+                for key, package in self.get().items()
+                if package.state == PackageState.UPDATE or key in created
+            }
+            self.commit_results = create_results + JiraWriteExecutor(
+                conf.JIRA_WRITE_WORKERS
+            ).run(operations)
+            self._transitions.save()
 
-                    created_ticket = self._jira.create_issue(fields=issue_dict)
-                    current_ticket_lane = JiraLane(
-                        created_ticket.fields.__dict__.get("status").name
-                    )
-                    if current_ticket_lane != package.jira_lane:
-                        self._jira.transition_issue(
-                            created_ticket, package.catalog.transition_id
-                        )
-
-                elif package.state == PackageState.UPDATE:
-                    # Update package information
-                    existing_ticket = self._jira.search_issues(
-                        f"project={conf.JIRA_PROJECT_KEY} AND "
-                        f"key={package.jira_id} "
-                    )[
-                        0
-                    ]  # type: Issue
-
-                    logger.debug(f"Updating ticket for package {package}")
-
-                    existing_ticket.update(fields=issue_dict)
-                    current_ticket_lane = JiraLane(
-                        existing_ticket.fields.__dict__.get("status").name
-                    )
-                    if current_ticket_lane != package.jira_lane:
-                        self._jira.transition_issue(
-                            existing_ticket, package.catalog.transition_id
-                        )
+            failed = [result for result in self.commit_results if result.error]
+            if failed:
+                logger.error(
+                    f"{len(failed)} of {len(self.commit_results)} jira "
+                    f"operations failed."
+                )
             return True
 
         return False
@@ -304,15 +1177,24 @@ class JiraBoardProvider(Provider):
 
         :param munki_packages: `Dict` of all munki packages
         """
+        # the board is only loaded here if it was not loaded before, in which
+        # case the packages are processed while they arrive
+        if self.is_loaded:
+            packages = self.get().values()
+        else:
+            packages = self.iter_packages()
+
+        for existing_issue in packages:
+            if (
+                existing_issue.key in munki_packages
+                and existing_issue.is_present == Present.MISSING
+            ):
+                existing_issue.is_present = Present.PRESENT
+                existing_issue.state = PackageState.UPDATE
+
         for munki_key, munki_package in munki_packages.items():
-            munki_package = copy.deepcopy(munki_package)
-            if not self._get(munki_key):
+            if munki_key not in self._packages_dict:
                 logger.debug(f"Adding munki package {munki_package} to jira.")
+                munki_package = copy.deepcopy(munki_package)
                 munki_package.state = PackageState.NEW
                 self._packages_dict.update({munki_key: munki_package})
-                continue
-
-            existing_issue = self._get(munki_key)
-            if existing_issue.is_present == Present.MISSING:
-                existing_issue.is_present = Present.PRESENT
-                existing_issue.state = PackageState.UPDATE
@@ -0,0 +1,138 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:03
+
+import json
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from src.utils import logger as log
+from src.utils.fileio import write_files_atomically
+
+logger = log.get_logger(__file__)
+
+
+class JiraTransitionCache:
+    """
+    Caches the ids of the transitions of jira workflows by their name, such
+    that the transitions available on an issue do not need to be requested
+    before every transition. The ids are the same for all issues using the
+    same workflow, therefore they are cached per workflow. Together with the
+    id, the fields on the screen of every transition are cached.
+
+    If a path is given, the cache is kept on disk between runs.
+    """
+
+    def __init__(self, path: str = ""):
+        """
+        :param path: `str` path of the JSON file the cache is stored in, the
+        cache is only kept in memory if it is empty
+        """
+        self.path = path
+        self.lock = threading.RLock()
+        self._workflows = dict()  # type: Dict[str, Dict[str, Dict]]
+        self._changed = False
+
+        if path:
+            try:
+                with open(path, "r") as f:
+                    workflows = json.load(f)
+                if not self._is_valid(workflows):
+                    raise ValueError("unexpected format")
+                self._workflows = workflows
+            except FileNotFoundError:
+                pass
+            except ValueError as e:
+                logger.warning(f"Ignoring invalid transition cache {path}: {e}")
+
+    @staticmethod
+    def _is_valid(workflows) -> bool:
+        """
+        Checks the format of a loaded cache, such that e.g. a cache of an
+        older version which only stored the ids is discarded.
+
+        :param workflows: JSON of the cache
+        :return: True if it maps every workflow to the transitions by name,
+        each with its ``id`` and the ``fields`` of its screen
+        """
+        return isinstance(workflows, dict) and all(
+            isinstance(transitions, dict)
+            and all(
+                isinstance(transition, dict)
+                and isinstance(transition.get("id"), str)
+                and isinstance(transition.get("fields"), list)
+                for transition in transitions.values()
+            )
+            for transitions in workflows.values()
+        )
+
+    def get(self, workflow: str, name: str) -> Optional[str]:
+        """
+        :param workflow: `str` identifying the workflow
+        :param name: `str` name of the transition, compared case insensitive
+        :return: `str` id of the transition or None if it is not cached
+        """
+        transition = self._workflows.get(workflow, dict()).get(name.lower())
+        return transition.get("id") if transition else None
+
+    def allows_fields(
+        self, workflow: str, name: str, fields: Iterable[str]
+    ) -> bool:
+        """
+        :param workflow: `str` identifying the workflow
+        :param name: `str` name of the transition, compared case insensitive
+        :param fields: `Iterable` of the ids of the fields to set
+        :return: True if all fields are on the screen of the transition and
+        can therefore be set while transitioning
+        """
+        transition = self._workflows.get(workflow, dict()).get(name.lower())
+        return bool(transition) and set(fields).issubset(transition["fields"])
+
+    def update(self, workflow: str, transitions: List[Dict]):
+        """
+        Caches the transitions available on an issue of a workflow.
+
+        :param workflow: `str` identifying the workflow
+        :param transitions: `List` of the transitions as returned by jira, each
+        containing at least the ``id`` and ``name`` and the ``fields`` of its
+        screen if they were expanded
+        """
+        self._workflows.setdefault(workflow, dict()).update(
+            {
+                t["name"].lower(): {
+                    "id": str(t["id"]),
+                    "fields": sorted(t.get("fields") or dict()),
+                }
+                for t in transitions
+            }
+        )
+        self._changed = True
+
+    def invalidate(self, workflow: str):
+        """
+        Removes all cached transitions of a workflow, e.g. because one of them
+        turned out to be invalid after the workflow was changed.
+
+        :param workflow: `str` identifying the workflow
+        """
+        if self._workflows.pop(workflow, None) is not None:
+            logger.debug(f"Invalidated cached transitions of {workflow}.")
+            self._changed = True
+
+    def save(self):
+        """
+        Writes the cache to disk if a path is configured and it changed.
+        """
+        if not self.path or not self._changed:
+            return
+
+        path = self.path
+        data = json.dumps(self._workflows, indent=2, sort_keys=True).encode()
+        error = write_files_atomically({path: data}).get(path)
+        if error:
+            logger.warning(f"Could not write transition cache {path}: {error}")
+            return
+        self._changed = False
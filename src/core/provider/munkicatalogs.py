@@ -0,0 +1,105 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:03
+
+import os
+import plistlib
+from typing import Dict, List
+
+from src.utils import logger as log
+from src.utils.fileio import write_files_atomically
+
+logger = log.get_logger(__file__)
+
+
+def catalog_item(pkg_info: Dict) -> Dict:
+    """
+    Converts a pkg info into the item makecatalogs stores in the catalogs.
+    Like makecatalogs, admin notes and all keys starting with an underscore
+    (e.g. `_metadata`) are not copied.
+
+    :param pkg_info: `Dict` the parsed pkg info
+    :return: `Dict` the catalog item
+    """
+    return {
+        key: value
+        for key, value in pkg_info.items()
+        if key != "notes" and not key.startswith("_")
+    }
+
+
+def update_catalogs(catalogs_path: str, pkg_infos: List[Dict]) -> bool:
+    """
+    Updates the catalogs of a munki repository for the given pkg infos only,
+    instead of rebuilding them from all pkg infos like makecatalogs does.
+    The entries of the pkg infos are replaced in the `all` catalog and every
+    catalog the pkg infos were or now are part of is rewritten from it. The
+    order of the items stays the same as the one makecatalogs produced.
+
+    :param catalogs_path: `str` path of the catalogs directory
+    :param pkg_infos: `List` of the pkg infos which were written
+    :return: True if the catalogs were updated, False if they can not be
+    updated incrementally and a full rebuild is needed.
+    """
+    all_path = os.path.join(catalogs_path, "all")
+    if not os.path.exists(all_path):
+        logger.info("No all catalog exists, can not update incrementally.")
+        return False
+
+    with open(all_path, "rb") as f:
+        all_items = plistlib.load(f)
+
+    positions = dict()
+    for position, item in enumerate(all_items):
+        key = (item.get("name"), item.get("version"))
+        # an item listed twice can not be updated unambiguously
+        positions[key] = None if key in positions else position
+
+    affected_catalogs = set()
+    for pkg_info in pkg_infos:
+        position = positions.get(
+            (pkg_info.get("name"), pkg_info.get("version"))
+        )
+        if position is None:
+            logger.info(
+                f"{pkg_info.get('name')} {pkg_info.get('version')} not found "
+                f"exactly once in the all catalog, can not update "
+                f"incrementally."
+            )
+            return False
+
+        new_item = catalog_item(pkg_info)
+        if "icon_hash" in all_items[position]:
+            # makecatalogs adds the hash of the icon, which is not part of the
+            # pkg info itself
+            new_item.setdefault("icon_hash", all_items[position]["icon_hash"])
+
+        affected_catalogs.update(all_items[position].get("catalogs", []))
+        affected_catalogs.update(new_item.get("catalogs", []))
+        all_items[position] = new_item
+
+    catalogs = {all_path: plistlib.dumps(all_items)}
+    for catalog in sorted(affected_catalogs):
+        catalog_path = os.path.join(catalogs_path, catalog)
+        items = [
+            item for item in all_items if catalog in item.get("catalogs", [])
+        ]
+        if not items:
+            # like makecatalogs, do not keep catalogs without any items
+            if os.path.exists(catalog_path):
+                os.remove(catalog_path)
+            logger.debug(f"Removed empty catalog {catalog_path}.")
+            continue
+
+        catalogs.update({catalog_path: plistlib.dumps(items)})
+
+    for catalog_path, error in write_files_atomically(catalogs).items():
+        if error:
+            logger.error(f"Could not write catalog {catalog_path}: {error}")
+            return False
+        logger.debug(f"Wrote catalog {catalog_path}.")
+
+    return True
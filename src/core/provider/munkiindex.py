@@ -0,0 +1,131 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:03
+
+from __future__ import annotations
+
+import os
+import plistlib
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+from src.utils import logger as log
+
+logger = log.get_logger(__file__)
+
+# The only keys of a pkg info or catalog item the promoter needs.
+INDEX_KEYS = ("name", "version", "catalogs", "munkipromote")
+# Version of the format the items are stored in, indexes of other versions are
+# rebuilt.
+INDEX_VERSION = 1
+
+
+def project(item: Dict) -> Dict:
+    """
+    Reduces a pkg info or catalog item to the keys stored in the index.
+
+    :param item: `Dict` the parsed plist item
+    :return: `Dict` containing only the keys of `INDEX_KEYS` present in `item`
+    """
+    return {key: item[key] for key in INDEX_KEYS if key in item}
+
+
+class PkgInfoIndex:
+    """
+    Persistent index of the promoter relevant fields of the plists in a munki
+    repository. Every file is stored together with its modification time and
+    size, such that a file only needs to be parsed again once it changed on
+    disk. The items are stored as binary plist, such that values like dates
+    and data are returned with the same types as if the file was parsed.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens or creates the SQLite index at the given path.
+
+        :param path: `str` path of the SQLite database file
+        """
+        self.path = path
+        self._db = sqlite3.connect(path)
+        (version,) = self._db.execute("PRAGMA user_version").fetchone()
+        if version != INDEX_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS files")
+            self._db.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, items BLOB)"
+        )
+
+    def __enter__(self) -> PkgInfoIndex:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self._db.commit()
+        self.close()
+
+    def close(self):
+        """
+        Closes the connection to the index.
+        """
+        self._db.close()
+
+    def get(self, path: str, stat: os.stat_result) -> Optional[List[Dict]]:
+        """
+        Looks up the indexed items of a file.
+
+        :param path: `str` path of the plist
+        :param stat: `os.stat_result` of the plist as it is on disk now
+        :return: `List` of the indexed items or None if the file is not
+        indexed or changed since it was indexed.
+        """
+        row = self._db.execute(
+            "SELECT items FROM files WHERE path=? AND mtime=? AND size=?",
+            (path, stat.st_mtime_ns, stat.st_size),
+        ).fetchone()
+        return plistlib.loads(row[0]) if row else None
+
+    def put(self, path: str, stat: os.stat_result, items: List[Dict]):
+        """
+        Adds or replaces the indexed items of a file.
+
+        :param path: `str` path of the plist
+        :param stat: `os.stat_result` of the plist when it was parsed
+        :param items: `List` of the parsed items, reduced to `INDEX_KEYS`
+        """
+        self._db.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+            (
+                path,
+                stat.st_mtime_ns,
+                stat.st_size,
+                plistlib.dumps(
+                    [project(item) for item in items], fmt=plistlib.FMT_BINARY
+                ),
+            ),
+        )
+
+    def prune(self, directory: str, seen: Iterable[str]):
+        """
+        Removes all files within a directory from the index which were not
+        seen during the last scan, e.g. because they were deleted.
+
+        :param directory: `str` directory which was scanned
+        :param seen: `Iterable` of the paths found during the scan
+        """
+        seen = set(seen)
+        prefix = os.path.join(directory, "")
+        stale = [
+            (path,)
+            for (path,) in self._db.execute(
+                "SELECT path FROM files WHERE substr(path, 1, ?) = ?",
+                (len(prefix), prefix),
+            )
+            if path not in seen
+        ]
+        if stale:
+            logger.debug(f"Removing {len(stale)} stale files from the index.")
+            self._db.executemany("DELETE FROM files WHERE path=?", stale)
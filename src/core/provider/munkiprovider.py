@@ -8,13 +8,19 @@
 from __future__ import annotations
 
 import copy
+import io
 import os
 import plistlib
 import subprocess
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
 from uuid import uuid4
 
 from src.core.base_classes import Provider, Package
+from src.core.provider.munkicatalogs import update_catalogs
+from src.core.provider.munkiindex import PkgInfoIndex, INDEX_KEYS
 from src.utils import logger as log
 from src.utils.config import (
     PackageState,
@@ -25,10 +31,29 @@ from src.utils.config import (
 )
 from src.utils.config import conf
 from src.utils.exceptions import MunkiItemInMultipleCatalogs, MunkiRepoNotFound
+from src.utils.fileio import write_files_atomically
+from src.utils.plist import (
+    iter_plist_array,
+    read_plist_keys,
+    replace_string_array,
+)
 
 logger = log.get_logger(__file__)
 
 
+def _read_pkg_info(pkg_info_path: str) -> Tuple[Dict, str]:
+    """
+    Reads the keys of a single pkg info plist which are needed to create a
+    `Package`. This is a module level function such that it can be pickled and
+    sent to the workers of a `ProcessPoolExecutor`.
+
+    :param pkg_info_path: `str` path to the pkg info plist
+    :return: `Tuple` of the parsed keys and the path they were read from
+    """
+    with open(pkg_info_path, "rb") as f:
+        return read_plist_keys(f, INDEX_KEYS), pkg_info_path
+
+
 class MunkiRepoProvider(Provider):
     """
     Connects to a specific munki repository and represents the state of the
@@ -45,6 +70,7 @@ class MunkiRepoProvider(Provider):
         """
         super().__init__(name, dry_run)
         self._pkg_info_files = dict(dict())
+        self._pkg_infos_loaded = False
 
     def connect(self):
         """
@@ -64,102 +90,230 @@ class MunkiRepoProvider(Provider):
             )
             raise MunkiRepoNotFound(conf.REPO_PATH)
 
-    def _load_packages(self):
+    def _load_packages(self, index: Optional[PkgInfoIndex] = None):
         """
         Loads all available munki packages as a `Dict` of `Package` by
         converting the information of all plists from the munki repository.
         Each key for which there is no information in the plist is set to the
         default value.
+
+        :param index: `PkgInfoIndex` used to skip parsing catalogs which did
+        not change since they were indexed
         """
         logger.debug(f"Loading packages from repo: {conf.REPO_PATH}")
         # clear internal packages dict, before loading for the first time OR
         # again
         self._packages_dict.clear()
+        catalog_paths = list()
         for filename in os.listdir(conf.CATALOGS_PATH):
-            if not (filename.startswith(".") or filename == "all"):
+            if filename.startswith("."):
                 # Ignore hidden files
-                munki_packages = plistlib.load(
-                    open(os.path.join(conf.CATALOGS_PATH, filename), "rb")
+                continue
+            if (filename == "all") != (conf.PACKAGES_SOURCE == "all"):
+                # Either read the single all catalog or every other catalog
+                continue
+
+            catalog_path = os.path.join(conf.CATALOGS_PATH, filename)
+            catalog_paths.append(catalog_path)
+            stat = os.stat(catalog_path)
+            munki_packages = index.get(catalog_path, stat) if index else None
+
+            if munki_packages is not None:
+                self._add_packages(munki_packages)
+                continue
+
+            with open(catalog_path, "rb") as f:
+                # Stream the catalog item by item and only read the keys we
+                # need, such that large catalogs are never held in memory.
+                munki_packages = iter_plist_array(f, INDEX_KEYS)
+                if index:
+                    munki_packages = list(munki_packages)
+                    index.put(catalog_path, stat, munki_packages)
+                self._add_packages(munki_packages)
+
+        if index:
+            index.prune(conf.CATALOGS_PATH, catalog_paths)
+
+    def _add_packages(self, items: Iterable[Dict]):
+        """
+        Converts catalog or pkg info items to `Package` objects and adds them
+        to the internal packages dict. Items which are not part of any catalog
+        are ignored, as they do not show up in any of the catalog files either.
+
+        :param items: `Iterable` of catalog or pkg info items
+        """
+        for item in items:
+            if not item.get("catalogs"):
+                continue
+
+            try:
+                # If we find something like this in our pkginfo we will
+                # use the provided information instead
+                # Otherwise fallback to default values.
+                # <key>munkipromote</key>
+                # 	<dict>
+                # 		<key>promotiondate</key>
+                # 		<string>2019-07-16</string>
+                # 		<key>autopromote</key>
+                # 		<true/>
+                # 	</dict>
+
+                promote_info = item.get("munkipromote")
+                if promote_info and "promotiondate" in promote_info:
+                    promotion_date = datetime.strptime(
+                        promote_info.get("promotiondate"), "%Y-%m-%d"
+                    )
+                else:
+                    promotion_date = datetime.now() + timedelta(
+                        days=conf.DEFAULT_PROMOTION_INTERVAL
+                    )
+
+                if promote_info and "autopromote" in promote_info:
+                    if promote_info.get("autopromote"):
+                        autopromote = JiraAutopromote.PROMOTE
+                    else:
+                        autopromote = JiraAutopromote.NOPROMOTE
+                else:
+                    autopromote = JiraAutopromote.PROMOTE
+
+                if len(item.get("catalogs")) > 1:
+                    raise MunkiItemInMultipleCatalogs(item)
+                else:
+                    item_catalog = Catalog.str_to_catalog(
+                        item.get("catalogs")[0]
+                    )
+
+                p = Package(
+                    name=item.get("name"),
+                    version=item.get("version"),
+                    catalog=item_catalog,
+                    promote_date=promotion_date,
+                    is_autopromote=autopromote,
+                    is_present=Present.PRESENT,
+                    provider=MunkiRepoProvider,
+                    jira_id=None,
+                    jira_lane=JiraLane.catalog_to_lane(item_catalog),
+                    state=PackageState.DEFAULT,
+                    munki_uuid=uuid4(),
                 )
 
-                for item in munki_packages:
-                    try:
-                        # If we find something like this in our pkginfo we will
-                        # use the provided information instead
-                        # Otherwise fallback to default values.
-                        # <key>munkipromote</key>
-                        # 	<dict>
-                        # 		<key>promotiondate</key>
-                        # 		<string>2019-07-16</string>
-                        # 		<key>autopromote</key>
-                        # 		<true/>
-                        # 	</dict>
-
-                        promote_info = item.get("munkipromote")
-                        if promote_info and "promotiondate" in promote_info:
-                            promotion_date = datetime.strptime(
-                                promote_info.get("promotiondate"), "%Y-%m-%d"
-                            )
-                        else:
-                            promotion_date = datetime.now() + timedelta(
-                                days=conf.DEFAULT_PROMOTION_INTERVAL
-                            )
+                self._packages_dict.update({p.key: p})
+            except MunkiItemInMultipleCatalogs as e:
+                logger.error(e)
 
-                        if promote_info and "autopromote" in promote_info:
-                            if promote_info.get("autopromote"):
-                                autopromote = JiraAutopromote.PROMOTE
-                            else:
-                                autopromote = JiraAutopromote.NOPROMOTE
-                        else:
-                            autopromote = JiraAutopromote.PROMOTE
-
-                        if len(item.get("catalogs")) > 1:
-                            raise MunkiItemInMultipleCatalogs(item)
-                        else:
-                            item_catalog = Catalog.str_to_catalog(
-                                item.get("catalogs")[0]
-                            )
+    @staticmethod
+    def _pkg_info_paths() -> List[str]:
+        """
+        Collects the paths of all pkg info files in the munki repository.
+        Hidden files are ignored.
 
-                        p = Package(
-                            name=item.get("name"),
-                            version=item.get("version"),
-                            catalog=item_catalog,
-                            promote_date=promotion_date,
-                            is_autopromote=autopromote,
-                            is_present=Present.PRESENT,
-                            provider=MunkiRepoProvider,
-                            jira_id=None,
-                            jira_lane=JiraLane.catalog_to_lane(item_catalog),
-                            state=PackageState.DEFAULT,
-                            munki_uuid=uuid4(),
-                        )
+        :return: `List` of paths in the order `os.walk` visits them
+        """
+        return [
+            os.path.join(dirpath, file)
+            for dirpath, _dirnames, filenames in os.walk(conf.PKGS_INFO_PATH)
+            for file in filenames
+            if not file.startswith(".")
+        ]
 
-                        self._packages_dict.update({p.key: p})
-                    except MunkiItemInMultipleCatalogs as e:
-                        logger.error(e)
+    @staticmethod
+    def _read_pkg_infos(pkg_info_paths: List[str]):
+        """
+        Reads the given pkg info files with `conf.PKGS_INFO_LOAD_WORKERS`
+        workers. Threads are used for I/O bound repositories (e.g. on a network
+        mount) and processes if `conf.PKGS_INFO_LOAD_EXECUTOR` is set to
+        ``process`` for CPU bound parsing.
+
+        :param pkg_info_paths: `List` of paths to the pkg info files
+        :return: iterator over tuples of the parsed plist and its path, in the
+        same order as `pkg_info_paths`
+        """
+        workers = conf.PKGS_INFO_LOAD_WORKERS
+        if workers <= 1 or len(pkg_info_paths) <= 1:
+            return map(_read_pkg_info, pkg_info_paths)
+
+        if conf.PKGS_INFO_LOAD_EXECUTOR == "process":
+            # hand out the paths in chunks, otherwise the inter process
+            # communication outweighs the parsing of a single small plist
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(
+                    executor.map(
+                        _read_pkg_info,
+                        pkg_info_paths,
+                        chunksize=max(1, len(pkg_info_paths) // (workers * 4)),
+                    )
+                )
 
-    def _load_pkg_infos(self):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_read_pkg_info, pkg_info_paths))
+
+    def _load_pkg_infos(self, index: Optional[PkgInfoIndex] = None) -> List:
         """
-        Saves all the pkg info in form of the plists in the `MunkiRepoProvider`.
+        Saves the paths of all pkg info plists by name and version in the
+        `MunkiRepoProvider`. Only the keys needed to create a `Package` are
+        read, the complete plist is read in :func:`commit` once it is written.
+        Files which did not change since they were added to the `index` are not
+        parsed again.
+
+        :param index: `PkgInfoIndex` used to skip parsing unchanged files
+        :return: `List` of all pkg infos, parsed or indexed, in the order they
+        were found. They can be passed to :func:`_add_packages` directly.
         """
-        for dirpath, _dirnames, filenames in os.walk(conf.PKGS_INFO_PATH):
-            for file in filenames:
-                if file.startswith("."):
-                    continue
+        self._pkg_info_files.clear()
+        pkg_info_paths = self._pkg_info_paths()
+        pkg_infos = list()
+
+        stats = dict()
+        indexed = dict()
+        if index:
+            for pkg_info_path in pkg_info_paths:
+                stats[pkg_info_path] = os.stat(pkg_info_path)
+                items = index.get(pkg_info_path, stats[pkg_info_path])
+                if items:
+                    indexed[pkg_info_path] = items[0]
+
+        parsed = {
+            pkg_info_path: pkg_info
+            for pkg_info, pkg_info_path in self._read_pkg_infos(
+                [p for p in pkg_info_paths if p not in indexed]
+            )
+        }
 
-                pkg_info_path = os.path.join(dirpath, file)
-                pkg_info = plistlib.load(open(pkg_info_path, "rb"))
+        for pkg_info_path in pkg_info_paths:
+            if pkg_info_path in parsed:
+                pkg_info = parsed.get(pkg_info_path)
+                if index:
+                    index.put(pkg_info_path, stats[pkg_info_path], [pkg_info])
+            else:
+                pkg_info = indexed.get(pkg_info_path)
+            pkg_infos.append(pkg_info)
 
-                # at index 0 we store the actual plist and at index 1 the path
-                # to that plist file is stored.
-                d = {pkg_info.get("version"): (pkg_info, pkg_info_path)}
+            d = {pkg_info.get("version"): pkg_info_path}
 
-                if self._pkg_info_files.get(pkg_info.get("name")):
-                    # pkg info files with this name already stored -> update
-                    self._pkg_info_files.get(pkg_info.get("name")).update(d)
-                else:
-                    # no pkg info files with this name already stored -> add
-                    self._pkg_info_files.update({pkg_info.get("name"): d})
+            if self._pkg_info_files.get(pkg_info.get("name")):
+                # pkg info files with this name already stored -> update
+                self._pkg_info_files.get(pkg_info.get("name")).update(d)
+            else:
+                # no pkg info files with this name already stored -> add
+                self._pkg_info_files.update({pkg_info.get("name"): d})
+
+        if index:
+            index.prune(conf.PKGS_INFO_PATH, pkg_info_paths)
+
+        self._pkg_infos_loaded = True
+        return pkg_infos
+
+    @staticmethod
+    def _open_index():
+        """
+        Opens the pkg info index configured in `conf.PKGS_INFO_INDEX_PATH`.
+
+        :return: `PkgInfoIndex` or a context returning None if no index is
+        configured
+        """
+        if conf.PKGS_INFO_INDEX_PATH:
+            return PkgInfoIndex(conf.PKGS_INFO_INDEX_PATH)
+        return nullcontext()
 
     def load(self):
         """
@@ -168,10 +322,26 @@ class MunkiRepoProvider(Provider):
         :func:`_load_packages` if they are not yet loaded and if the connection
         to the munki repository
         exists.
+
+        Depending on `conf.PACKAGES_SOURCE` the repository is only traversed
+        once: With ``pkgsinfo`` the packages are created from the pkg infos
+        directly and with ``all`` they are read from the single all catalog,
+        while the pkg infos are only loaded in :func:`commit` if any of them
+        needs to be written.
         """
         if self.is_loaded or self.connect():
-            self._load_packages()
-            self._load_pkg_infos()
+            self._pkg_infos_loaded = False
+            with self._open_index() as index:
+                if conf.PACKAGES_SOURCE == "pkgsinfo":
+                    logger.debug(
+                        f"Loading packages from pkgsinfo: {conf.REPO_PATH}"
+                    )
+                    self._packages_dict.clear()
+                    self._add_packages(self._load_pkg_infos(index))
+                else:
+                    self._load_packages(index)
+                    if conf.PACKAGES_SOURCE != "all":
+                        self._load_pkg_infos(index)
             self.is_loaded = True
 
     def update(self, package: Package):
@@ -217,6 +387,40 @@ class MunkiRepoProvider(Provider):
             f"Munki update called for {package}, but no changes detected."
         )
 
+    @staticmethod
+    def _update_pkg_info_catalogs(
+        pkg_info_path: str, catalogs: List[str]
+    ) -> Optional[bytes]:
+        """
+        Reads a pkg info and replaces its catalogs. Only the bytes of the
+        catalogs array are replaced, such that the rest of the file stays
+        exactly as it is. If the file does not have the expected structure it
+        is parsed and serialised completely instead.
+
+        :param pkg_info_path: `str` path of the pkg info
+        :param catalogs: `List` of the new catalogs
+        :return: `bytes` of the updated pkg info or None if the pkg info is
+        already in exactly these catalogs and does not need to be written
+        """
+        with open(pkg_info_path, "rb") as f:
+            data = f.read()
+
+        if read_plist_keys(io.BytesIO(data), ["catalogs"]).get(
+            "catalogs"
+        ) == list(catalogs):
+            return None
+
+        updated = replace_string_array(data, "catalogs", catalogs)
+        if updated is None:
+            logger.debug(
+                f"Could not replace the catalogs in {pkg_info_path}, "
+                f"serialising the complete pkg info instead."
+            )
+            pkg_info = plistlib.loads(data)
+            pkg_info.update({"catalogs": catalogs})
+            updated = plistlib.dumps(pkg_info)
+        return updated
+
     def commit(self) -> bool:
         """
         Checks if the program runs as a dry run and if this is not the case, all
@@ -226,31 +430,41 @@ class MunkiRepoProvider(Provider):
         committed.
         """
         if not self._dry_run:
+            if not self._pkg_infos_loaded and any(
+                package.state == PackageState.UPDATE
+                for package in self._packages_dict.values()
+            ):
+                with self._open_index() as index:
+                    self._load_pkg_infos(index)
+
+            # maps the path to write to, to the pkg info to read from and the
+            # new catalogs
+            updates = dict()
             for package in self._packages_dict.values():
                 if package.state == PackageState.UPDATE:
-                    pkg_info, pkg_info_path = self._pkg_info_files.get(
-                        package.name
-                    ).get(str(package.version))
+                    pkg_info_path = self._pkg_info_files.get(package.name).get(
+                        str(package.version)
+                    )
 
-                    if pkg_info:
+                    if pkg_info_path:
                         # Plist already exists in Repo so we can continue to
                         # update it.
-                        pkg_info.update(
-                            {"catalogs": [package.catalog.name.lower()]}
-                        )
-
-                        f = open(
+                        target_path = (
                             os.path.join(
                                 conf.DEBUG_PKGS_INFO_SAVE_PATH,
                                 os.path.basename(pkg_info_path),
                             )
                             if conf.DEBUG_PKGS_INFO_SAVE_PATH
-                            else pkg_info_path,
-                            "wb",
+                            else pkg_info_path
+                        )
+                        updates.update(
+                            {
+                                target_path: (
+                                    pkg_info_path,
+                                    [package.catalog.name.lower()],
+                                )
+                            }
                         )
-                        plistlib.dump(pkg_info, f)
-                        logger.debug(f"Wrote pkg info file at {f.name}")
-                        f.close()
                     else:
                         # Plist does not exist in Repo, and we can not create a
                         # new one.
@@ -266,15 +480,76 @@ class MunkiRepoProvider(Provider):
                         f"state is {package.state}"
                     )
 
-            MunkiRepoProvider.make_catalogs()
+            with ThreadPoolExecutor(
+                max_workers=max(1, conf.PKGS_INFO_WRITE_WORKERS)
+            ) as executor:
+                futures = {
+                    target_path: executor.submit(
+                        self._update_pkg_info_catalogs, *update
+                    )
+                    for target_path, update in updates.items()
+                }
+                pkg_info_data = dict()
+                # a pkg info which can not be read does not abort the others
+                read_errors = dict()
+                for target_path, future in futures.items():
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        read_errors[target_path] = e
+                        continue
+                    if data is None:
+                        logger.debug(
+                            f"Pkg info {target_path} not written, because its "
+                            f"catalogs did not change."
+                        )
+                        continue
+                    pkg_info_data.update({target_path: data})
+
+            written_pkg_infos = list()
+            results = write_files_atomically(
+                pkg_info_data,
+                workers=conf.PKGS_INFO_WRITE_WORKERS,
+                batch_size=conf.PKGS_INFO_FSYNC_BATCH_SIZE,
+            )
+            results.update(read_errors)
+            for path, error in results.items():
+                if error:
+                    logger.error(f"Could not write pkg info {path}: {error}")
+                    continue
+
+                logger.debug(f"Wrote pkg info file at {path}")
+                if not conf.DEBUG_PKGS_INFO_SAVE_PATH:
+                    written_pkg_infos.append(
+                        plistlib.loads(pkg_info_data.get(path))
+                    )
+
+            MunkiRepoProvider.make_catalogs(written_pkg_infos)
             return True
         return False
 
     @staticmethod
-    def make_catalogs():
+    def make_catalogs(pkg_infos: Optional[List[Dict]] = None):
         """
-        Run makecatalogs and check whether the return code is 0.
+        Updates the catalogs after pkg infos were written. If the native
+        catalog builder is configured, only the entries of the given pkg infos
+        are updated with :func:`munkicatalogs.update_catalogs`. Otherwise, or
+        if no pkg infos are given or the catalogs can not be updated
+        incrementally, makecatalogs is run to rebuild all catalogs. If the
+        given list is empty nothing was written and nothing needs to be done.
+
+        :param pkg_infos: `List` of the pkg infos which were written
         """
+        if pkg_infos is not None and not pkg_infos:
+            logger.info("No pkg infos written, catalogs are up to date.")
+            return
+
+        if pkg_infos is not None and conf.CATALOG_BUILDER == "native":
+            if update_catalogs(conf.CATALOGS_PATH, pkg_infos):
+                logger.info(f"Updated catalogs for {len(pkg_infos)} pkg infos.")
+                return
+            logger.info("Falling back to a full rebuild with makecatalogs.")
+
         cmd = [
             "python2",
             conf.MAKECATALOGS,
@@ -88,6 +88,24 @@ class MunkiPromoter:
             correct_config = False
             logger.critical("Your make catalogs path is wrong, please correct.")
 
+        if conf.CATALOG_BUILDER not in ("native", "makecatalogs"):
+            correct_config = False
+            logger.critical(
+                "The catalog builder must either be native or makecatalogs."
+            )
+
+        if conf.PACKAGES_SOURCE not in ("catalogs", "pkgsinfo", "all"):
+            correct_config = False
+            logger.critical(
+                "The packages source must either be catalogs, pkgsinfo or all."
+            )
+
+        if conf.PKGS_INFO_LOAD_EXECUTOR not in ("thread", "process"):
+            correct_config = False
+            logger.critical(
+                "The pkgs info load executor must either be thread or process."
+            )
+
         config_file_path = os.path.join(conf.LOG_DIR, conf.LOG_FILENAME)
         if not os.path.exists(config_file_path):
             correct_config = False
@@ -111,7 +129,7 @@ class MunkiPromoter:
     @staticmethod
     def _setup_argparser():
         """
-        Initializes a argument parser that takes 6 optional arguments.
+        Initializes a argument parser that takes 7 optional arguments.
 
         :return: :func:`argparse.ArgumentParser` with the given arguments.
         """
@@ -133,6 +151,14 @@ class MunkiPromoter:
             dest="DRY_RUN",
             default=conf.DRY_RUN,
         )
+        parser.add_argument(
+            "-f",
+            "--full-makecatalogs",
+            action="store_const",
+            const="makecatalogs",
+            dest="CATALOG_BUILDER",
+            default=conf.CATALOG_BUILDER,
+        )
         parser.add_argument(
             "-j",
             "--jira-server",
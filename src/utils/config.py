@@ -75,6 +75,51 @@ class MunkiPromoterConfig:
             ),
         )
 
+        CATALOG_BUILDER = os.getenv(
+            "MUNKIPROMOTER_CATALOG_BUILDER",
+            config_from_file.get(ConfigSections.MUNKI.value, "CATALOG_BUILDER"),
+        )
+        PACKAGES_SOURCE = os.getenv(
+            "MUNKIPROMOTER_PACKAGES_SOURCE",
+            config_from_file.get(ConfigSections.MUNKI.value, "PACKAGES_SOURCE"),
+        )
+        PKGS_INFO_LOAD_WORKERS = int(
+            os.getenv(
+                "MUNKIPROMOTER_PKGS_INFO_LOAD_WORKERS",
+                config_from_file.get(
+                    ConfigSections.MUNKI.value, "PKGS_INFO_LOAD_WORKERS"
+                ),
+            )
+        )
+        PKGS_INFO_LOAD_EXECUTOR = os.getenv(
+            "MUNKIPROMOTER_PKGS_INFO_LOAD_EXECUTOR",
+            config_from_file.get(
+                ConfigSections.MUNKI.value, "PKGS_INFO_LOAD_EXECUTOR"
+            ),
+        )
+        PKGS_INFO_WRITE_WORKERS = int(
+            os.getenv(
+                "MUNKIPROMOTER_PKGS_INFO_WRITE_WORKERS",
+                config_from_file.get(
+                    ConfigSections.MUNKI.value, "PKGS_INFO_WRITE_WORKERS"
+                ),
+            )
+        )
+        PKGS_INFO_FSYNC_BATCH_SIZE = int(
+            os.getenv(
+                "MUNKIPROMOTER_PKGS_INFO_FSYNC_BATCH_SIZE",
+                config_from_file.get(
+                    ConfigSections.MUNKI.value, "PKGS_INFO_FSYNC_BATCH_SIZE"
+                ),
+            )
+        )
+        PKGS_INFO_INDEX_PATH = os.getenv(
+            "MUNKIPROMOTER_PKGS_INFO_INDEX_PATH",
+            config_from_file.get(
+                ConfigSections.MUNKI.value, "PKGS_INFO_INDEX_PATH"
+            ),
+        )
+
         JIRA_URL = os.getenv(
             "MUNKIPROMOTER_JIRA_URL",
             config_from_file.get(ConfigSections.JIRA.value, "JIRA_URL"),
@@ -197,6 +242,104 @@ class MunkiPromoterConfig:
             ),
         )
 
+        JIRA_SEARCH_PAGINATION = os.getenv(
+            "MUNKIPROMOTER_JIRA_SEARCH_PAGINATION",
+            config_from_file.get(
+                ConfigSections.JIRA.value, "JIRA_SEARCH_PAGINATION"
+            ),
+        )
+        JIRA_LOAD_WORKERS = int(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_LOAD_WORKERS",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_LOAD_WORKERS"
+                ),
+            )
+        )
+        JIRA_WRITE_WORKERS = int(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_WRITE_WORKERS",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_WRITE_WORKERS"
+                ),
+            )
+        )
+
+        JIRA_REQUESTS_PER_SECOND = float(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_REQUESTS_PER_SECOND",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_REQUESTS_PER_SECOND"
+                ),
+            )
+        )
+        JIRA_MAX_RETRIES = int(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_MAX_RETRIES",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_MAX_RETRIES"
+                ),
+            )
+        )
+        JIRA_TARGET_LATENCY = float(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_TARGET_LATENCY",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_TARGET_LATENCY"
+                ),
+            )
+        )
+        JIRA_POOL_SIZE = int(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_POOL_SIZE",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_POOL_SIZE"
+                ),
+            )
+        )
+        JIRA_CONNECT_TIMEOUT = float(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_CONNECT_TIMEOUT",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_CONNECT_TIMEOUT"
+                ),
+            )
+        )
+        JIRA_READ_TIMEOUT = float(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_READ_TIMEOUT",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_READ_TIMEOUT"
+                ),
+            )
+        )
+        JIRA_TRANSPORT_RETRIES = int(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_TRANSPORT_RETRIES",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_TRANSPORT_RETRIES"
+                ),
+            )
+        )
+        JIRA_TRANSITIONS_CACHE_PATH = os.getenv(
+            "MUNKIPROMOTER_JIRA_TRANSITIONS_CACHE_PATH",
+            config_from_file.get(
+                ConfigSections.JIRA.value, "JIRA_TRANSITIONS_CACHE_PATH"
+            ),
+        )
+        JIRA_MIRROR_PATH = os.getenv(
+            "MUNKIPROMOTER_JIRA_MIRROR_PATH",
+            config_from_file.get(ConfigSections.JIRA.value, "JIRA_MIRROR_PATH"),
+        )
+        JIRA_MIRROR_RECONCILE_INTERVAL = float(
+            os.getenv(
+                "MUNKIPROMOTER_JIRA_MIRROR_RECONCILE_INTERVAL",
+                config_from_file.get(
+                    ConfigSections.JIRA.value, "JIRA_MIRROR_RECONCILE_INTERVAL"
+                ),
+            )
+        )
+
         ISSUE_FIELDS = [
             JIRA_SOFTWARE_NAME_FIELD,
             JIRA_SOFTWARE_VERSION_FIELD,
@@ -329,6 +472,25 @@ class MunkiPromoterTestConfig(MunkiPromoterConfig):
             os.path.dirname(__file__), "../../tests/jira_dump"
         )
         self.instance.DRY_RUN = True
+        self.instance.DEBUG_PKGS_INFO_SAVE_PATH = None
+        self.instance.CATALOG_BUILDER = "native"
+        self.instance.PACKAGES_SOURCE = "catalogs"
+        self.instance.PKGS_INFO_LOAD_WORKERS = 8
+        self.instance.PKGS_INFO_LOAD_EXECUTOR = "thread"
+        self.instance.PKGS_INFO_INDEX_PATH = ""
+        self.instance.JIRA_SEARCH_PAGINATION = "offset"
+        self.instance.JIRA_LOAD_WORKERS = 4
+        self.instance.JIRA_WRITE_WORKERS = 8
+        self.instance.JIRA_REQUESTS_PER_SECOND = 0
+        self.instance.JIRA_MAX_RETRIES = 5
+        self.instance.JIRA_TARGET_LATENCY = 5
+        self.instance.JIRA_POOL_SIZE = 16
+        self.instance.JIRA_CONNECT_TIMEOUT = 10
+        self.instance.JIRA_READ_TIMEOUT = 60
+        self.instance.JIRA_TRANSPORT_RETRIES = 3
+        self.instance.JIRA_TRANSITIONS_CACHE_PATH = ""
+        self.instance.JIRA_MIRROR_PATH = ""
+        self.instance.JIRA_MIRROR_RECONCILE_INTERVAL = 24
 
 
 conf = (
@@ -0,0 +1,28 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
+
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Decodes JSON with `orjson` if it is installed, which is several times
+    faster than the `json` module of the standard library, and falls back to
+    the latter otherwise.
+
+    :param data: `bytes` or `str` containing the JSON document
+    :return: the decoded document
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
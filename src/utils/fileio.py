@@ -0,0 +1,117 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
+
+import os
+import stat
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+# Mode of files which did not exist before they were written.
+DEFAULT_FILE_MODE = 0o644
+
+
+def _write_temp_file(path: str, data: bytes) -> str:
+    """
+    Writes the data to a hidden temporary file next to the given path and
+    flushes it to disk. The temporary file gets the mode of the file it will
+    replace.
+
+    :param path: `str` path of the file which will be replaced
+    :param data: `bytes` to write
+    :return: `str` path of the temporary file
+    """
+    directory, filename = os.path.split(path)
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{filename}.", suffix=".tmp", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = DEFAULT_FILE_MODE
+        os.chmod(temp_path, mode)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def _fsync_directory(directory: str):
+    """
+    Flushes the entries of a directory to disk, such that renames within it
+    are persisted. Not all platforms and file systems support this, in which
+    case nothing is done.
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_files_atomically(
+    files: Dict[str, bytes], workers: int = 1, batch_size: int = 64
+) -> Dict[str, Optional[Exception]]:
+    """
+    Writes multiple files atomically. Every file is first written to a
+    temporary file in the same directory and then renamed to its final path,
+    therefore a crash never leaves a truncated file behind.
+
+    The files are written in batches of `batch_size`. Within a batch the
+    temporary files are written and synced concurrently by `workers` threads,
+    before they are renamed and every affected directory is synced once.
+    A failing file does not abort the other writes.
+
+    :param files: `Dict` mapping the paths to the `bytes` to write
+    :param workers: number of files written concurrently
+    :param batch_size: number of files after which the renames are persisted
+    :return: `Dict` mapping every path to None if it was written or to the
+    exception which occurred while writing it
+    """
+    results = dict()
+    paths = list(files)
+    batch_size = max(1, batch_size)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for batch_start in range(0, len(paths), batch_size):
+            batch = paths[batch_start : batch_start + batch_size]
+            futures = {
+                path: executor.submit(_write_temp_file, path, files.get(path))
+                for path in batch
+            }
+
+            directories = set()
+            for path, future in futures.items():
+                try:
+                    temp_path = future.result()
+                except Exception as e:
+                    results[path] = e
+                    continue
+
+                try:
+                    os.replace(temp_path, path)
+                except Exception as e:
+                    os.remove(temp_path)
+                    results[path] = e
+                    continue
+                results[path] = None
+                directories.add(os.path.dirname(path) or os.curdir)
+
+            for directory in directories:
+                _fsync_directory(directory)
+
+    return results
@@ -0,0 +1,361 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
+
+import binascii
+import plistlib
+from collections import deque
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
+from xml.parsers import expat
+from xml.sax.saxutils import escape
+
+# Number of bytes fed to the XML parser at once.
+CHUNK_SIZE = 64 * 1024
+
+_BINARY_PLIST_HEADER = b"bplist00"
+
+
+class _ArraySink:
+    """
+    Stand-in for the root array of a plist. Instead of collecting the items of
+    the array they are handed out through `items` as soon as they are complete.
+    """
+
+    def __init__(self):
+        self.items = deque()
+
+    def append(self, item: Any):
+        self.items.append(item)
+
+
+class _AllKeysSeen(Exception):
+    """
+    Raised by the parser to stop parsing as soon as all requested keys of a
+    plist with a dict as root element were read.
+    """
+
+
+class _StreamingPlistParser:
+    """
+    Incremental XML plist parser with the same value conversion as `plistlib`.
+    If the root of the plist is an array, its items are not kept in memory but
+    are collected in `sink` one by one, such that they can be consumed while
+    the file is still being parsed.
+
+    If `keys` are given, only these keys of the root dict or of the dicts in
+    the root array are read. The values of all other keys are skipped without
+    being converted.
+    """
+
+    def __init__(self, keys: Optional[Iterable[str]] = None):
+        self.sink = None  # type: _ArraySink
+        self.root = None
+        self._projection = frozenset(keys) if keys is not None else None
+        self._skip_depth = 0
+        self._skip_next = False
+        self._stack = list()
+        self._keys = list()
+        self._data = list()
+        self._parser = expat.ParserCreate()
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._char_data
+
+    def feed(self, data: bytes, is_final: bool = False):
+        self._parser.Parse(data, is_final)
+
+    @property
+    def result(self) -> Any:
+        """
+        :return: the root value, or the root dict read so far if parsing was
+        stopped because all requested keys were seen
+        """
+        if self.root is None and self._stack:
+            return self._stack[0]
+        return self.root
+
+    def _is_item_level(self) -> bool:
+        """
+        :return: True if the innermost container is the root dict or a dict in
+        the root array, i.e. the dicts the projection applies to
+        """
+        return isinstance(self._stack[-1], dict) and len(self._stack) == (
+            2 if self.sink else 1
+        )
+
+    def _add_value(self, value: Any):
+        if not self._stack:
+            self.root = value
+        elif isinstance(self._stack[-1], dict):
+            self._stack[-1][self._keys.pop()] = value
+            if (
+                self._projection is not None
+                and self.sink is None
+                and len(self._stack) == 1
+                and self._projection.issubset(self._stack[-1])
+            ):
+                raise _AllKeysSeen()
+        else:
+            self._stack[-1].append(value)
+
+    def _char_data(self, data: str):
+        if not self._skip_depth:
+            self._data.append(data)
+
+    def _start(self, element: str, _attrs: dict):
+        if self._skip_depth:
+            self._skip_depth += 1
+            return
+        if self._skip_next:
+            # value of a key which is not part of the projection
+            self._skip_next = False
+            self._skip_depth = 1
+            return
+
+        self._data.clear()
+        if element == "dict":
+            self._stack.append(dict())
+        elif element == "array":
+            if not self._stack and self.root is None:
+                self.sink = _ArraySink()
+                self._stack.append(self.sink)
+            else:
+                self._stack.append(list())
+
+    def _end(self, element: str):
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+
+        if element in ("dict", "array"):
+            value = self._stack.pop()
+            if value is not self.sink:
+                self._add_value(value)
+            return
+
+        text = "".join(self._data)
+        if element == "key":
+            if (
+                self._projection is not None
+                and text not in self._projection
+                and self._is_item_level()
+            ):
+                self._skip_next = True
+            else:
+                self._keys.append(text)
+        elif element == "string":
+            self._add_value(text)
+        elif element == "integer":
+            self._add_value(int(text, 16 if text[:2] in ("0x", "0X") else 10))
+        elif element == "real":
+            self._add_value(float(text))
+        elif element == "true":
+            self._add_value(True)
+        elif element == "false":
+            self._add_value(False)
+        elif element == "date":
+            self._add_value(datetime.strptime(text, "%Y-%m-%dT%H:%M:%SZ"))
+        elif element == "data":
+            self._add_value(binascii.a2b_base64(text.encode()))
+
+
+def _project(item: Any, keys: Optional[Iterable[str]]) -> Any:
+    """
+    Reduces a dict parsed by `plistlib` to the given keys.
+    """
+    if keys is None or not isinstance(item, dict):
+        return item
+    return {key: item[key] for key in keys if key in item}
+
+
+def iter_plist_array(
+    fp: BinaryIO, keys: Optional[Iterable[str]] = None
+) -> Iterator:
+    """
+    Iterates over the items of a plist whose root element is an array, e.g. a
+    munki catalog. The file is parsed incrementally and every item is handed
+    out as soon as it is complete, therefore only a single item needs to be
+    held in memory no matter how large the file is.
+
+    Binary plists can not be parsed incrementally and are loaded completely
+    with `plistlib` instead.
+
+    :param fp: binary file object of the plist
+    :param keys: if given, only these keys of the dicts in the array are read
+    and all other values are skipped
+    :return: iterator over the items of the root array
+    """
+    chunk = fp.read(CHUNK_SIZE)
+    if chunk.startswith(_BINARY_PLIST_HEADER):
+        for item in plistlib.loads(chunk + fp.read()):
+            yield _project(item, keys)
+        return
+
+    parser = _StreamingPlistParser(keys)
+    while chunk:
+        parser.feed(chunk)
+        while parser.sink and parser.sink.items:
+            # pop the items, such that they are released as soon as the
+            # consumer is done with them
+            yield parser.sink.items.popleft()
+        chunk = fp.read(CHUNK_SIZE)
+    parser.feed(b"", is_final=True)
+
+    if parser.sink is None:
+        raise ValueError("The root element of the plist is not an array.")
+    while parser.sink.items:
+        yield parser.sink.items.popleft()
+
+
+def read_plist_keys(fp: BinaryIO, keys: Iterable[str]) -> Dict:
+    """
+    Reads only the given keys of a plist whose root element is a dict, e.g. a
+    munki pkg info. The values of all other keys are skipped without being
+    converted and parsing stops as soon as all requested keys were read.
+
+    :param fp: binary file object of the plist
+    :param keys: keys of the root dict to read
+    :return: `Dict` containing the requested keys which exist in the plist
+    """
+    chunk = fp.read(CHUNK_SIZE)
+    if chunk.startswith(_BINARY_PLIST_HEADER):
+        return _project(plistlib.loads(chunk + fp.read()), keys)
+
+    parser = _StreamingPlistParser(keys)
+    try:
+        while chunk:
+            parser.feed(chunk)
+            chunk = fp.read(CHUNK_SIZE)
+        parser.feed(b"", is_final=True)
+    except _AllKeysSeen:
+        pass
+
+    if not isinstance(parser.result, dict):
+        raise ValueError("The root element of the plist is not a dict.")
+    return parser.result
+
+
+class _UnexpectedStructure(Exception):
+    """
+    Raised while locating an array in a plist if the plist does not look like
+    expected, e.g. the key exists twice or the value is not an array.
+    """
+
+
+class _ArrayLocator:
+    """
+    Locates the byte range of the array stored under a key of the root dict of
+    an XML plist, without converting any of the values.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.start = None
+        self.end = None
+        self.child_start = None
+        self._depth = 0
+        self._in_array = False
+        self._expect_array = False
+        self._text = list()
+        self._parser = expat.ParserCreate()
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._text.append
+
+    def locate(self, data: bytes):
+        self._parser.Parse(data, True)
+        if self.start is None or self.end is None:
+            raise _UnexpectedStructure()
+
+    def _start(self, element: str, _attrs: dict):
+        self._depth += 1
+        self._text.clear()
+        if self._expect_array:
+            self._expect_array = False
+            if element != "array" or self.start is not None:
+                raise _UnexpectedStructure()
+            self._in_array = True
+            self.start = self._parser.CurrentByteIndex
+        elif self._in_array:
+            if element != "string" or self._depth != 4:
+                raise _UnexpectedStructure()
+            if self.child_start is None:
+                self.child_start = self._parser.CurrentByteIndex
+
+    def _end(self, element: str):
+        # plist > dict > key, i.e. a key of the root dict
+        if element == "key" and self._depth == 3:
+            self._expect_array = "".join(self._text) == self.key
+        elif self._in_array and element == "array" and self._depth == 3:
+            self._in_array = False
+            self.end = self._parser.CurrentByteIndex
+        self._depth -= 1
+
+
+def replace_string_array(
+    data: bytes, key: str, values: List[str]
+) -> Optional[bytes]:
+    """
+    Replaces the array of strings stored under a key of the root dict of an
+    XML plist, e.g. the catalogs of a pkg info. Only the bytes of the array are
+    replaced, therefore the order of the keys and the formatting of the rest
+    of the plist are kept as they are. The new array is indented like the
+    original one, in the same format `plistlib` writes.
+
+    :param data: `bytes` of the XML plist
+    :param key: key of the root dict whose array is replaced
+    :param values: `List` of strings of the new array
+    :return: `bytes` of the updated plist or None if the plist does not have
+    the expected structure, e.g. because it is a binary plist, the key does
+    not exist or its value is not an array of strings.
+    """
+    if data.startswith(_BINARY_PLIST_HEADER):
+        return None
+
+    locator = _ArrayLocator(key)
+    try:
+        locator.locate(data)
+    except (_UnexpectedStructure, expat.ExpatError):
+        return None
+
+    start = locator.start
+    # the locator reports the positions at which the tags begin, the array
+    # ends after the closing tag or after the start tag if it is self closing
+    end = data.index(b">", start) + 1
+    if data[end - 2 : end] != b"/>":
+        end = data.index(b">", locator.end) + 1
+
+    line_start = data.rfind(b"\n", 0, start) + 1
+    indent = data[line_start:start]
+    if indent.strip():
+        # not on its own line, write the array on a single line as well
+        indent, child_indent, newline = b"", b"", b""
+    else:
+        if locator.child_start is not None:
+            child_line = data.rfind(b"\n", 0, locator.child_start) + 1
+            child_indent = data[child_line : locator.child_start]
+        else:
+            child_indent = indent + b"\t"
+        # keeps the line endings of the plist, e.g. if it was written on windows
+        crlf = data[line_start - 2 : line_start] == b"\r\n"
+        newline = b"\r\n" if crlf else b"\n"
+
+    if values:
+        array = b"<array>" + newline
+        for value in values:
+            array += (
+                child_indent
+                + b"<string>"
+                + escape(value).encode()
+                + b"</string>"
+                + newline
+            )
+        array += indent + b"</array>"
+    else:
+        array = b"<array/>"
+
+    return data[:start] + array + data[end:]
@@ -0,0 +1,266 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional
+
+from src.utils import logger as log
+
+logger = log.get_logger(__file__)
+
+
+class TokenBucket:
+    """
+    Limits the rate of requests. The bucket holds up to `capacity` tokens and
+    is refilled with `rate` tokens per second, every request takes a token.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Any] = time.sleep,
+    ):
+        """
+        :param rate: tokens added per second, 0 disables the limit
+        :param capacity: maximum number of tokens, i.e. the allowed burst,
+        defaults to one second worth of tokens
+        """
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a token, waits until it is available if the bucket is empty.
+        The token is reserved right away, such that concurrent callers are
+        served in the order they arrived.
+        """
+        if self.rate <= 0:
+            return
+
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity,
+                self._tokens + (now - self._updated) * self.rate,
+            )
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            self._sleep(wait)
+
+
+class AdaptiveConcurrencyLimit:
+    """
+    Limits the number of concurrent requests and adapts the limit to how the
+    server copes with the load: it is increased additively after every
+    request which succeeded in time and halved after a request which was
+    throttled, failed with a server error or was too slow (AIMD).
+    """
+
+    def __init__(self, initial: int, maximum: int, minimum: int = 1):
+        """
+        :param initial: number of concurrent requests allowed at the start
+        :param maximum: upper bound of the limit
+        :param minimum: lower bound of the limit
+        """
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits until another request is allowed and reserves it.
+        """
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, overloaded: bool):
+        """
+        Frees a reserved request and adapts the limit.
+
+        :param overloaded: True if the request showed that the server is
+        overloaded
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if overloaded:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """
+    :param error: `Exception` raised by a request
+    :return: the HTTP status code of the response which caused the error, or
+    None if there was no response
+    """
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    :param error: `Exception` raised by a request
+    :return: the seconds to wait according to the ``Retry-After`` header of
+    the response which caused the error, or None if it is not set
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
+
+
+class RequestScheduler:
+    """
+    Schedules the requests to a rate limited server. Before a request is sent
+    it needs a token of a `TokenBucket` and a slot of an
+    `AdaptiveConcurrencyLimit`.
+
+    Throttled requests (429) are retried after the time the server asked for
+    with ``Retry-After``, during which no other request is sent either.
+    Idempotent requests failing with a server error (5xx) are retried after an
+    exponential backoff with full jitter. Other requests may have been
+    processed despite the error, e.g. if a proxy timed out, therefore their
+    server errors are raised like all other errors immediately.
+    """
+
+    def __init__(
+        self,
+        rate: float = 0,
+        max_concurrency: int = 1,
+        max_retries: int = 5,
+        target_latency: float = 0,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Any] = time.sleep,
+    ):
+        """
+        :param rate: requests per second, 0 disables the limit
+        :param max_concurrency: maximum number of concurrent requests
+        :param max_retries: number of times a request is retried
+        :param target_latency: seconds after which a request is considered too
+        slow and the concurrency is reduced, 0 disables the check
+        :param backoff_base: seconds of the first backoff after a server error
+        :param backoff_max: maximum seconds of a single backoff
+        """
+        self.max_retries = max_retries
+        self.target_latency = target_latency
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate, clock=clock, sleep=sleep)
+        self.concurrency = AdaptiveConcurrencyLimit(
+            max_concurrency, max_concurrency
+        )
+        self._clock = clock
+        self._sleep = sleep
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _pause(self, seconds: float):
+        """
+        Stops sending any request for the given number of seconds.
+        """
+        with self._lock:
+            self._paused_until = max(
+                self._paused_until, self._clock() + seconds
+            )
+
+    def _wait_while_paused(self):
+        while True:
+            with self._lock:
+                wait = self._paused_until - self._clock()
+            if wait <= 0:
+                return
+            self._sleep(wait)
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        :param attempt: number of the failed attempt, starting at 0
+        :return: seconds to wait before the next attempt
+        """
+        return random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2**attempt)
+        )
+
+    def call(
+        self, function: Callable, *args, idempotent: bool = True, **kwargs
+    ) -> Any:
+        """
+        Calls a function sending a request as soon as the limits allow it and
+        retries it if the server is overloaded.
+
+        :param function: `Callable` sending the request
+        :param idempotent: False if sending the request twice has a different
+        effect than sending it once, e.g. creating an issue, in which case it
+        is not retried after a server error
+        :return: the return value of the function
+        """
+        attempt = 0
+        while True:
+            self._wait_while_paused()
+            self.bucket.acquire()
+            self.concurrency.acquire()
+            overloaded = False
+            start = self._clock()
+            try:
+                result = function(*args, **kwargs)
+                overloaded = bool(
+                    self.target_latency
+                    and self._clock() - start > self.target_latency
+                )
+                return result
+            except Exception as e:
+                code = status_code(e)
+                throttled = code == 429
+                overloaded = throttled or (code is not None and code >= 500)
+                retry = throttled or (overloaded and idempotent)
+                if not retry or attempt >= self.max_retries:
+                    raise
+
+                delay = self._backoff(attempt)
+                if throttled:
+                    delay = retry_after(e) or delay
+                    self._pause(delay)
+                logger.warning(
+                    f"Request failed with status {code}, retrying in "
+                    f"{delay:.1f} seconds."
+                )
+            finally:
+                self.concurrency.release(overloaded)
+
+            self._sleep(delay)
+            attempt += 1
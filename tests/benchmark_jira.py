@@ -0,0 +1,99 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
+
+"""
+Measures loading and committing of :class:`JiraBoardProvider` against the
+local stand-in server of :mod:`tests.fake_jira`, with every pagination of the
+search and a share of the issues changed and created.
+
+Run with ``python -m tests.benchmark_jira [issues] [latency] [fault rate]``,
+e.g. ``python -m tests.benchmark_jira 10000 0.05 0.01`` for 10000 issues,
+50ms per request and 1% of the requests throttled and failed each.
+"""
+
+import logging
+import sys
+import time
+
+from src.core.provider.jiraprovider import JiraBoardProvider
+from src.utils.config import conf, Catalog, JiraLane, PackageState
+from tests.fake_jira import FakeJiraServer, package_fields
+
+PAGINATIONS = ["offset", "token"]
+# share of the loaded issues changed before committing
+CHANGED = 0.05
+# number of new issues created per commit
+CREATED = 100
+
+
+def _provider(server: FakeJiraServer) -> JiraBoardProvider:
+    provider = JiraBoardProvider("benchmark", dry_run=False)
+    if not provider.connect(server.connection_params):
+        raise RuntimeError(f"Could not connect to {server.url}")
+    return provider
+
+
+def _change(provider: JiraBoardProvider, server: FakeJiraServer, offset: int):
+    packages = list(provider.get().values())
+    for package in packages[:: int(1 / CHANGED)]:
+        package.state = PackageState.UPDATE
+        package.catalog = Catalog.PRODUCTION
+        package.jira_lane = JiraLane.TO_PRODUCTION
+
+    for number in range(CREATED):
+        fields = package_fields(offset + number)
+        package = JiraBoardProvider._raw_issue_to_package(
+            {"fields": {**fields, "status": {"name": "To Testing"}}}
+        )
+        package.jira_id = None
+        # the lane the transition of the catalog of the package leads to
+        package.jira_lane = server.transitions[package.catalog.transition_id]
+        provider.update(package)
+
+
+def main(issues: int = 10000, latency: float = 0.02, fault_rate: float = 0):
+    # the benchmark is not interested in the log of every request
+    logging.disable(logging.WARNING)
+    conf.JIRA_MIRROR_PATH = ""
+    # the server throttles by itself according to the fault rate
+    conf.JIRA_REQUESTS_PER_SECOND = 0
+    conf.JIRA_TRANSITIONS_CACHE_PATH = ""
+
+    print(f"{'pagination':<12} {'load':>8} {'commit':>8} {'requests':>9}")
+    for pagination in PAGINATIONS:
+        conf.JIRA_SEARCH_PAGINATION = pagination
+        with FakeJiraServer(
+            latency=latency,
+            failure_rate=fault_rate,
+            throttle_rate=fault_rate,
+            retry_after=0.1,
+            max_results=1000,
+            seed=0,
+        ) as server:
+            server.add_packages(issues)
+            provider = _provider(server)
+
+            start = time.perf_counter()
+            provider.load()
+            loaded = time.perf_counter() - start
+
+            _change(provider, server, issues)
+            start = time.perf_counter()
+            provider.commit()
+            committed = time.perf_counter() - start
+
+            failed = [r for r in provider.commit_results if not r.ok]
+            print(
+                f"{pagination:<12} {loaded:>7.2f}s {committed:>7.2f}s "
+                f"{sum(server.requests.values()):>9}"
+                + (f" ({len(failed)} failed)" if failed else "")
+            )
+
+
+if __name__ == "__main__":
+    casts = (int, float, float)
+    main(*(casts[i](arg) for i, arg in enumerate(sys.argv[1:4])))
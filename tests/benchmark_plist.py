@@ -0,0 +1,68 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
+
+"""
+Compares the projection reader of :mod:`src.utils.plist` with `plistlib` on
+the catalog and pkgsinfo fixtures in tests/data.
+
+Run with ``python -m tests.benchmark_plist [repetitions]``.
+"""
+
+import os
+import plistlib
+import sys
+import timeit
+from functools import partial
+
+from src.utils.plist import iter_plist_array, read_plist_keys
+
+KEYS = ["name", "version", "catalogs", "munkipromote"]
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+
+def _plistlib(path):
+    with open(path, "rb") as f:
+        return plistlib.load(f)
+
+
+def _catalog_projection(path):
+    with open(path, "rb") as f:
+        return list(iter_plist_array(f, KEYS))
+
+
+def _pkg_info_projection(path):
+    with open(path, "rb") as f:
+        return read_plist_keys(f, KEYS)
+
+
+def _fixtures():
+    catalogs_path = os.path.join(DATA_PATH, "catalogs")
+    for filename in sorted(os.listdir(catalogs_path)):
+        yield os.path.join(catalogs_path, filename), _catalog_projection
+
+    for dirpath, _dirnames, filenames in os.walk(
+        os.path.join(DATA_PATH, "pkgsinfo")
+    ):
+        for filename in sorted(filenames):
+            yield os.path.join(dirpath, filename), _pkg_info_projection
+
+
+def main(repetitions: int = 2000):
+    print(f"{'file':<40} {'plistlib':>10} {'projection':>11} {'speedup':>8}")
+    for path, projection in _fixtures():
+        baseline = timeit.timeit(partial(_plistlib, path), number=repetitions)
+        projected = timeit.timeit(partial(projection, path), number=repetitions)
+        print(
+            f"{os.path.relpath(path, DATA_PATH)[-40:]:<40} "
+            f"{baseline / repetitions * 1e6:>8.1f}us "
+            f"{projected / repetitions * 1e6:>9.1f}us "
+            f"{baseline / projected:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
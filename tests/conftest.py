@@ -14,13 +14,13 @@ from typing import List
 from unittest.mock import Mock
 
 import pytest
-from jira.client import ResultList
 from jira.resources import cls_for_resource
 
 from src.core.base_classes import Package
 from src.core.promotion import Promoter
 from src.core.provider.jiraprovider import JiraBoardProvider
 from src.core.provider.munkiprovider import MunkiRepoProvider
+from tests.fake_jira import FakeJiraServer
 from src.utils.config import (
     Catalog,
     Present,
@@ -46,6 +46,12 @@ def jira_board_provider():
     return JiraBoardProvider("test_instance")
 
 
+@pytest.fixture
+def fake_jira(config):
+    with FakeJiraServer(seed=0) as server:
+        yield server
+
+
 @pytest.fixture
 def munki_repo_provider():
     return MunkiRepoProvider("test_instance")
@@ -139,9 +145,9 @@ def jira_test_issues(config):
 def set_up_promoter(jira_board_provider, munki_repo_provider, jira_test_issues):
     jira_board_provider._jira = Mock()
     jira_board_provider.is_loaded = True
-    jira_issue = [jira_test_issues]
-    result_list = ResultList(jira_issue, _total=len(jira_issue))
-    jira_board_provider._jira.search_issues.return_value = result_list
+    jira_board_provider._jira._session.get.return_value = search_response(
+        [jira_test_issues]
+    )
     jira_board_provider.load()
 
     munki_repo_provider.load()
@@ -155,6 +161,25 @@ def set_up_promoter(jira_board_provider, munki_repo_provider, jira_test_issues):
     return Promoter(munki_repo_provider.get(), jira_board_provider.get())
 
 
+def search_response(issues: List, total: int = None, start_at: int = 0) -> Mock:
+    """
+    Creates the response of jira to an issue search.
+    :param issues: The found issues, either as `Issue` or as their JSON.
+    :param total: The total number of issues of the search, defaults to the
+    number of given issues.
+    :param start_at: The index of the first given issue.
+    :return: A `Mock` of the response whose content is the JSON of the search.
+    """
+    issues = [getattr(issue, "raw", issue) for issue in issues]
+    content = {
+        "startAt": start_at,
+        "maxResults": len(issues),
+        "total": len(issues) if total is None else total,
+        "issues": issues,
+    }
+    return Mock(content=json.dumps(content).encode())
+
+
 def is_exact_match(p1: Package, p2: Package, exclude_keys: List = None) -> bool:
     """
     Compare ALL fields of a package to another package to check whether we have
@@ -0,0 +1,550 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
+
+"""
+Local stand-in for the subset of the Jira REST API used by
+:class:`src.core.provider.jiraprovider.JiraBoardProvider`, such that the
+provider can be tested and benchmarked against real HTTP requests without a
+Jira instance.
+
+Supported are the server info, the search with pagination by offset
+(``search``) and by token (``search/jql``), creating issues one by one and in
+bulk, updating issues, and listing and executing transitions. Like Jira, the
+fields of a created issue are validated by their shape and the transitions
+available on an issue depend on its status. The searches
+understand the JQL the provider sends: ``project=``, ``key in (...)``,
+``updated >= -Nm`` and ``ORDER BY key``.
+
+Every request can be delayed by a configurable latency, and requests can be
+answered with a server error (503) or throttled (429 with ``Retry-After``) at
+a configurable rate.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.utils.config import conf, Catalog, JiraLane
+
+API_PATH = "/rest/api/2/"
+PROJECT_ID = "10000"
+ISSUE_TYPE_ID = "10001"
+
+
+class FakeJiraServer:
+    """
+    Jira REST API stand-in running in a background thread. Use it as context
+    manager or call :func:`start` and :func:`stop`.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        max_results: int = 100,
+        screen_fields: Iterable[str] = (),
+        workflow: Optional[Dict[JiraLane, Iterable[str]]] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        :param latency: seconds every request is delayed
+        :param failure_rate: share of requests answered with a server error
+        :param throttle_rate: share of requests answered with 429
+        :param retry_after: seconds sent in ``Retry-After`` of throttled
+        requests
+        :param max_results: maximum number of issues per search batch, like
+        Jira caps the requested ``maxResults``
+        :param screen_fields: ids of the fields on the screen of every
+        transition, which may be set while transitioning
+        :param workflow: names of the transitions available in each status, by
+        default every transition is available except the one leading to the
+        status itself
+        :param seed: seed of the random failures and throttling
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.max_results = max_results
+        self.screen_fields = list(screen_fields)
+        # the status every transition leads to by its name
+        self.transitions = {
+            conf.JIRA_DEVELOPMENT_TRANSITION_NAME: JiraLane.TO_DEVELOPMENT,
+            conf.JIRA_TESTING_TRANSITION_NAME: JiraLane.TO_TESTING,
+            conf.JIRA_PRODUCTION_TRANSITION_NAME: JiraLane.TO_PRODUCTION,
+        }
+        if workflow is None:
+            workflow = {
+                status: [
+                    name
+                    for name, to in self.transitions.items()
+                    if to != status
+                ]
+                for status in JiraLane
+            }
+        self.workflow = {
+            status: list(names) for status, names in workflow.items()
+        }
+        self.issues = dict()  # type: Dict[str, Dict]
+        # number of answered requests by method and endpoint
+        self.requests = Counter()
+        self._updated = dict()  # type: Dict[str, float]
+        self._next_id = 10000
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._server = None  # type: Optional[ThreadingHTTPServer]
+        self._thread = None  # type: Optional[threading.Thread]
+
+    def __enter__(self) -> FakeJiraServer:
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        """
+        :return: `str` base url of the running server
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def connection_params(self) -> Dict:
+        """
+        :return: `Dict` parameters to connect the jira client to the server
+        """
+        return {"server": self.url, "basic_auth": ("user", "password")}
+
+    def start(self) -> FakeJiraServer:
+        """
+        Starts the server on a free port of localhost.
+        """
+        self._server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), _handler_class(self)
+        )
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the server.
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def add_issue(
+        self, fields: Dict, status: JiraLane = JiraLane.TO_DEVELOPMENT
+    ) -> Dict:
+        """
+        Adds an issue without a request, e.g. to prepare a board.
+
+        :param fields: `Dict` of the fields of the issue
+        :param status: `JiraLane` the issue is in
+        :return: `Dict` the JSON of the added issue
+        """
+        with self._lock:
+            issue_id = str(self._next_id)
+            self._next_id += 1
+            key = f"{conf.JIRA_PROJECT_KEY}-{issue_id}"
+            issue = {
+                "id": issue_id,
+                "key": key,
+                "self": f"{API_PATH}issue/{issue_id}",
+                "fields": {**fields, "status": {"name": status.value}},
+            }
+            self.issues[key] = issue
+            self._updated[key] = time.time()
+            return issue
+
+    def add_packages(self, number: int) -> List[Dict]:
+        """
+        Adds issues of distinct packages spread over all lanes.
+
+        :param number: `int` number of issues to add
+        :return: `List` of the JSON of the added issues
+        """
+        lanes = list(JiraLane)
+        return [
+            self.add_issue(package_fields(i), lanes[i % len(lanes)])
+            for i in range(number)
+        ]
+
+    def _fault(self) -> Optional[int]:
+        """
+        :return: status code of an injected fault or None
+        """
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.throttle_rate:
+            return 429
+        if draw < self.throttle_rate + self.failure_rate:
+            return 503
+        return None
+
+    def _search(self, params: Dict) -> List[Dict]:
+        """
+        :param params: `Dict` query parameters of a search
+        :return: `List` of the JSON of the matching issues, reduced to the
+        requested fields
+        """
+        jql = params.get("jql", "")
+        project = re.search(r"project\s*=\s*(\w+)", jql)
+        keys = re.search(r"key in \(([^)]*)\)", jql)
+        minutes = re.search(r"updated >= -(\d+)m", jql)
+
+        with self._lock:
+            issues = list(self.issues.values())
+            updated = dict(self._updated)
+
+        if project:
+            issues = [
+                i for i in issues if i["key"].startswith(project.group(1) + "-")
+            ]
+        if keys:
+            wanted = {k.strip() for k in keys.group(1).split(",")}
+            issues = [i for i in issues if i["key"] in wanted]
+        if minutes:
+            since = time.time() - int(minutes.group(1)) * 60
+            issues = [i for i in issues if updated[i["key"]] >= since]
+        issues.sort(key=lambda i: int(i["id"]))
+
+        fields = params.get("fields", "*all").split(",")
+        if "*all" in fields:
+            return issues
+        return [
+            {
+                "id": i["id"],
+                "key": i["key"],
+                "self": i["self"],
+                "fields": {
+                    name: value
+                    for name, value in i["fields"].items()
+                    if name in fields
+                },
+            }
+            for i in issues
+        ]
+
+    def _max_results(self, params: Dict) -> int:
+        return min(int(params.get("maxResults", 50)), self.max_results)
+
+    def search(self, params: Dict) -> Dict:
+        """
+        Search paginated by offset.
+        """
+        issues = self._search(params)
+        start_at = int(params.get("startAt", 0))
+        max_results = self._max_results(params)
+        return {
+            "startAt": start_at,
+            "maxResults": max_results,
+            "total": len(issues),
+            "issues": issues[start_at : start_at + max_results],
+        }
+
+    def search_jql(self, params: Dict) -> Dict:
+        """
+        Search paginated by token. The token is the id after which the next
+        batch starts, such that it does not shift if issues are added.
+        """
+        issues = self._search(params)
+        after = int(params.get("nextPageToken", 0))
+        issues = [i for i in issues if int(i["id"]) > after]
+        max_results = self._max_results(params)
+
+        result = {"issues": issues[:max_results]}
+        if len(issues) > max_results:
+            result["nextPageToken"] = issues[max_results - 1]["id"]
+        else:
+            result["isLast"] = True
+        return result
+
+    @staticmethod
+    def _field_errors(fields: Dict) -> Dict[str, str]:
+        """
+        Validates the fields required to create an issue like Jira does. The
+        project and issue type have to be objects referencing them by key or
+        name respectively, or by id.
+
+        :param fields: `Dict` of the fields of the issue to create
+        :return: `Dict` of the error message by field, empty if all are valid
+        """
+        references = {
+            conf.JIRA_PROJECT_FIELD: ("key", conf.JIRA_PROJECT_KEY, PROJECT_ID),
+            conf.JIRA_ISSUE_TYPE_FIELD: (
+                "name",
+                conf.JIRA_ISSUE_TYPE,
+                ISSUE_TYPE_ID,
+            ),
+        }
+        errors = dict()
+        for field, (attribute, value, reference_id) in references.items():
+            reference = fields.get(field)
+            if reference is None:
+                errors[field] = f"{field} is required."
+            elif not isinstance(reference, dict):
+                errors[field] = "data was not an object"
+            elif not (
+                reference.get(attribute) == value
+                or str(reference.get("id")) == reference_id
+            ):
+                errors[field] = f"valid {field} is required"
+
+        summary = fields.get(conf.JIRA_SUMMARY_FIELD)
+        if not isinstance(summary, str) or not summary.strip():
+            errors[conf.JIRA_SUMMARY_FIELD] = (
+                "You must specify a summary of the issue."
+            )
+        return errors
+
+    def create(self, fields: Dict) -> Dict:
+        """
+        Creates an issue.
+
+        :raise ValueError: if a required field is missing or invalid
+        """
+        errors = self._field_errors(fields)
+        if errors:
+            raise ValueError(errors)
+        issue = self.add_issue(fields)
+        return {k: issue[k] for k in ("id", "key", "self")}
+
+    def create_bulk(self, body: Dict) -> Dict:
+        """
+        Creates multiple issues, collecting the errors of the failed ones.
+        """
+        result = {"issues": list(), "errors": list()}
+        for number, update in enumerate(body.get("issueUpdates", [])):
+            try:
+                result["issues"].append(self.create(update.get("fields", {})))
+            except ValueError as e:
+                result["errors"].append(
+                    {
+                        "status": 400,
+                        "elementErrors": {"errors": e.args[0]},
+                        "failedElementNumber": number,
+                    }
+                )
+        return result
+
+    def update(self, key: str, fields: Dict):
+        """
+        Sets the given fields of an issue.
+
+        :raise KeyError: if the issue does not exist
+        """
+        with self._lock:
+            self.issues[key]["fields"].update(fields)
+            self._updated[key] = time.time()
+
+    def list_transitions(self, key: str) -> Dict:
+        """
+        Lists the transitions available in the status of an issue. The id of a
+        transition is the same in every status.
+
+        :raise KeyError: if the issue does not exist
+        """
+        with self._lock:
+            status = JiraLane(self.issues[key]["fields"]["status"]["name"])
+        available = self.workflow.get(status, list())
+        return {
+            "transitions": [
+                {
+                    "id": str(number + 11),
+                    "name": name,
+                    "to": {"name": lane.value},
+                    "fields": {
+                        f: {"required": False} for f in self.screen_fields
+                    },
+                }
+                for number, (name, lane) in enumerate(self.transitions.items())
+                if name in available
+            ]
+        }
+
+    def transition(self, key: str, body: Dict):
+        """
+        Transitions an issue and sets the fields on the screen.
+
+        :raise KeyError: if the issue does not exist
+        :raise ValueError: if the transition is not available in the status of
+        the issue or a field is invalid
+        """
+        transitions = {
+            t["id"]: t for t in self.list_transitions(key)["transitions"]
+        }
+        transition = transitions.get(str(body.get("transition", {}).get("id")))
+        if transition is None:
+            raise ValueError({"transition": "Invalid transition."})
+        fields = body.get("fields") or dict()
+        invalid = set(fields) - set(self.screen_fields)
+        if invalid:
+            raise ValueError(
+                {f: "Field is not on the screen." for f in invalid}
+            )
+
+        self.update(
+            key, {**fields, "status": {"name": transition["to"]["name"]}}
+        )
+
+    def handle(
+        self, method: str, path: str, params: Dict, body: Dict
+    ) -> Tuple[int, Optional[Dict], Dict]:
+        """
+        Answers a request after the configured latency, unless a fault is
+        injected.
+
+        :param method: `str` HTTP method of the request
+        :param path: `str` path of the request relative to the REST API
+        :param params: `Dict` query parameters of the request
+        :param body: `Dict` JSON body of the request
+        :return: `Tuple` of the status code, JSON body and headers of the
+        response
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            endpoint = re.sub(r"issue/(?!bulk)[^/]+", "issue/{key}", path)
+            self.requests[f"{method} {endpoint}"] += 1
+
+        fault = self._fault()
+        if fault == 429:
+            return (
+                429,
+                {"errorMessages": ["Rate limit exceeded."]},
+                {"Retry-After": str(self.retry_after)},
+            )
+        if fault:
+            return fault, {"errorMessages": ["Service unavailable."]}, {}
+
+        try:
+            status, result = self._route(method, path, params, body)
+        except KeyError:
+            status, result = 404, {"errorMessages": ["Issue does not exist."]}
+        except ValueError as e:
+            status, result = 400, {"errorMessages": [], "errors": e.args[0]}
+        return status, result, {}
+
+    def _route(
+        self, method: str, path: str, params: Dict, body: Dict
+    ) -> Tuple[int, Optional[Dict]]:
+        """
+        :return: `Tuple` of the status code and JSON body of the response
+        """
+        parts = path.split("/")
+        if method == "GET" and path == "serverInfo":
+            return 200, {
+                "baseUrl": self.url,
+                "version": "8.0.0",
+                "versionNumbers": [8, 0, 0],
+                "deploymentType": "Server",
+            }
+        if method == "GET" and path == "search":
+            return 200, self.search(params)
+        if method == "GET" and path == "search/jql":
+            return 200, self.search_jql(params)
+        if method == "POST" and path == "issue/bulk":
+            result = self.create_bulk(body)
+            failed = result["errors"] and not result["issues"]
+            return 400 if failed else 201, result
+        if method == "POST" and path == "issue":
+            return 201, self.create(body.get("fields", {}))
+        if method == "PUT" and parts[0] == "issue" and len(parts) == 2:
+            self.update(parts[1], body.get("fields", {}))
+            return 204, None
+        if parts[0] == "issue" and parts[2:] == ["transitions"]:
+            if method == "GET":
+                return 200, self.list_transitions(parts[1])
+            self.transition(parts[1], body)
+            return 204, None
+        return 404, {"errorMessages": [f"No {method} {path}."]}
+
+
+def package_fields(number: int) -> Dict:
+    """
+    :param number: `int` number distinguishing the package
+    :return: `Dict` fields of an issue representing a package
+    """
+    catalogs = list(Catalog)
+    return {
+        conf.JIRA_PROJECT_FIELD: {"key": conf.JIRA_PROJECT_KEY},
+        conf.JIRA_ISSUE_TYPE_FIELD: {"name": conf.JIRA_ISSUE_TYPE},
+        conf.JIRA_SUMMARY_FIELD: f"Package {number}",
+        conf.JIRA_SOFTWARE_NAME_FIELD: f"Package {number}",
+        conf.JIRA_SOFTWARE_VERSION_FIELD: f"1.0.{number}",
+        conf.JIRA_CATALOG_FIELD: {"id": catalogs[number % len(catalogs)].value},
+        conf.JIRA_AUTOPROMOTE_FIELD: {"id": conf._JIRA_AUTOPROMOTE_TRUE},
+        conf.JIRA_PRESENT_FIELD: [{"id": "12010"}],
+        conf.JIRA_DUEDATE_FIELD: "2019-07-16",
+        conf.JIRA_LABELS_FIELD: [],
+        conf.JIRA_DESCRIPTION_FIELD: "",
+    }
+
+
+def _handler_class(server: FakeJiraServer):
+    """
+    :param server: `FakeJiraServer` answering the requests
+    :return: request handler class bound to the server
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        # keeps the connections alive between requests
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _handle(self, method: str):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            status, result, headers = server.handle(
+                method, url.path[len(API_PATH) :].strip("/"), params, body
+            )
+
+            data = b"" if result is None else json.dumps(result).encode()
+            if data and "gzip" in self.headers.get("Accept-Encoding", ""):
+                data = gzip.compress(data, compresslevel=1)
+                headers = {**headers, "Content-Encoding": "gzip"}
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PUT(self):
+            self._handle("PUT")
+
+    return Handler
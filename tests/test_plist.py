@@ -0,0 +1,164 @@
+#  Gmacht mit ❤️ in Basel
+#
+#  Copyright (c) 2019 University of Basel
+#  Last modified 16/07/2019, 12:55.
+#
+#  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
+
+import io
+import os
+import plistlib
+from datetime import datetime
+
+import pytest
+
+from src.utils.plist import (
+    iter_plist_array,
+    read_plist_keys,
+    replace_string_array,
+    CHUNK_SIZE,
+)
+
+KEYS = ["name", "version", "catalogs", "munkipromote"]
+
+
+class TestPlist:
+    @pytest.mark.parametrize("catalog", ["all", "production", "testing"])
+    def test_iter_plist_array(self, config, catalog):
+        """Tests that streaming a catalog yields the same items as plistlib."""
+        with open(os.path.join(config.CATALOGS_PATH, catalog), "rb") as f:
+            expected = plistlib.load(f)
+        with open(os.path.join(config.CATALOGS_PATH, catalog), "rb") as f:
+            assert list(iter_plist_array(f)) == expected
+
+    @pytest.mark.parametrize("fmt", [plistlib.FMT_XML, plistlib.FMT_BINARY])
+    def test_iter_plist_array_values(self, fmt):
+        """Tests that all plist value types are converted like plistlib."""
+        items = [
+            {
+                "name": "Firefox & <Friends>",
+                "integer": 42,
+                "real": 1.5,
+                "true": True,
+                "false": False,
+                "data": b"\x00munki",
+                "date": datetime(2019, 7, 16, 13, 4),
+                "array": [],
+                "dict": {"nested": ["a", {"b": 0x10}]},
+            }
+        ] * 3
+        fp = io.BytesIO(plistlib.dumps(items, fmt=fmt))
+        assert list(iter_plist_array(fp)) == items
+
+    def test_iter_plist_array_streams(self):
+        """
+        Tests that the first item is yielded before the whole catalog was read.
+        """
+        items = [{"name": str(i), "installs": ["x" * 100]} for i in range(5000)]
+        fp = io.BytesIO(plistlib.dumps(items))
+        iterator = iter_plist_array(fp)
+
+        assert next(iterator) == items[0]
+        assert fp.tell() == CHUNK_SIZE
+        assert list(iterator) == items[1:]
+
+    def test_iter_plist_array_no_array(self):
+        """Tests that a plist with a dict as root element is rejected."""
+        with pytest.raises(ValueError):
+            list(iter_plist_array(io.BytesIO(plistlib.dumps({"a": 1}))))
+
+    @pytest.mark.parametrize("catalog", ["all", "production", "testing"])
+    def test_iter_plist_array_projection(self, config, catalog):
+        """Tests that only the requested keys of each item are read."""
+        with open(os.path.join(config.CATALOGS_PATH, catalog), "rb") as f:
+            expected = [
+                {key: item[key] for key in KEYS if key in item}
+                for item in plistlib.load(f)
+            ]
+        with open(os.path.join(config.CATALOGS_PATH, catalog), "rb") as f:
+            assert list(iter_plist_array(f, KEYS)) == expected
+
+    def test_read_plist_keys(self, config):
+        """Tests that the projection of every pkg info matches plistlib."""
+        for dirpath, _dirnames, filenames in os.walk(config.PKGS_INFO_PATH):
+            for filename in filenames:
+                with open(os.path.join(dirpath, filename), "rb") as f:
+                    pkg_info = plistlib.load(f)
+                with open(os.path.join(dirpath, filename), "rb") as f:
+                    assert read_plist_keys(f, KEYS) == {
+                        key: pkg_info[key] for key in KEYS if key in pkg_info
+                    }
+
+    def test_read_plist_keys_stops_early(self):
+        """
+        Tests that parsing stops once all keys were seen and that skipped
+        values are not converted.
+        """
+        pkg_info = {
+            "catalogs": ["testing"],
+            "icon_hash": "0" * CHUNK_SIZE,
+            "name": "Firefox",
+            "version": "60.8.0",
+            "zz_data": b"\x00" * (4 * CHUNK_SIZE),
+        }
+        fp = io.BytesIO(plistlib.dumps(pkg_info))
+
+        assert read_plist_keys(fp, ["name", "version", "catalogs"]) == {
+            "catalogs": ["testing"],
+            "name": "Firefox",
+            "version": "60.8.0",
+        }
+        assert fp.tell() < len(fp.getvalue())
+
+        fp = io.BytesIO(plistlib.dumps(pkg_info, fmt=plistlib.FMT_BINARY))
+        assert read_plist_keys(fp, ["name"]) == {"name": "Firefox"}
+
+    @pytest.mark.parametrize(
+        "old, new",
+        [
+            (["testing"], ["production"]),
+            (["testing", "production"], ["development"]),
+            ([], ["a & <b>"]),
+            (["testing"], []),
+        ],
+    )
+    def test_replace_string_array(self, old, new):
+        """
+        Tests that only the array is replaced and the result is formatted
+        exactly like plistlib would format it.
+        """
+        pkg_info = {
+            "_metadata": {"catalogs": old},
+            "catalogs": old,
+            "installs": [{"catalogs": old}],
+            "name": "Firefox",
+        }
+        data = replace_string_array(plistlib.dumps(pkg_info), "catalogs", new)
+
+        pkg_info.update({"catalogs": new})
+        assert data == plistlib.dumps(pkg_info)
+
+    @pytest.mark.parametrize("old", [["testing"], []])
+    def test_replace_string_array_crlf(self, old):
+        """Tests that the line endings of a plist written on windows are kept."""
+        pkg_info = {"catalogs": old, "name": "Firefox"}
+        data = plistlib.dumps(pkg_info).replace(b"\n", b"\r\n")
+        data = replace_string_array(data, "catalogs", ["a", "b"])
+
+        pkg_info.update({"catalogs": ["a", "b"]})
+        assert data == plistlib.dumps(pkg_info).replace(b"\n", b"\r\n")
+
+    @pytest.mark.parametrize(
+        "pkg_info, fmt",
+        [
+            ({"name": "Firefox"}, plistlib.FMT_XML),
+            ({"catalogs": "testing"}, plistlib.FMT_XML),
+            ({"catalogs": [["testing"]]}, plistlib.FMT_XML),
+            ({"nested": {"catalogs": ["testing"]}}, plistlib.FMT_XML),
+            ({"catalogs": ["testing"]}, plistlib.FMT_BINARY),
+        ],
+    )
+    def test_replace_string_array_unexpected(self, pkg_info, fmt):
+        """Tests that unexpected structures are not patched."""
+        data = plistlib.dumps(pkg_info, fmt=fmt)
+        assert replace_string_array(data, "catalogs", ["production"]) is None
@@ -6,24 +6,46 @@
 #  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
 
 import copy
+import io
+import json
+import os
+import plistlib
+import shutil
+import sqlite3
+import threading
+import time
 from datetime import datetime
 from random import random
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pytest
-from jira import Issue
-from jira.client import ResultList
+import requests
+from jira import JIRAError
 
 from src.core.base_classes import Package, Provider
+from src.core.provider.jiraexecutor import JiraWriteExecutor
 from src.core.provider.jiraprovider import JiraBoardProvider
+from src.core.provider.munkiindex import PkgInfoIndex
 from src.core.provider.munkiprovider import MunkiRepoProvider
-from src.utils.config import PackageState, Present
+from src.utils.config import (
+    PackageState,
+    Present,
+    Catalog,
+    JiraLane,
+    JiraAutopromote,
+)
 from src.utils.exceptions import (
     JiraIssueMissingFields,
     ProviderDoesNotImplement,
     MunkiRepoNotFound,
 )
-from tests.conftest import is_exact_match
+from tests.conftest import is_exact_match, search_response
+from tests.fake_jira import (
+    API_PATH,
+    PROJECT_ID,
+    FakeJiraServer,
+    package_fields,
+)
 
 
 @pytest.mark.usefixtures("run_makecatalogs_before")
@@ -42,16 +64,278 @@ class TestJiraBoardProvider:
         # do not throw a exception.
         assert not jira_board_provider.connect(connection_params=param)
 
-    def test_load(self, jira_board_provider, jira_test_issues):
+    def test_connect_session(self, jira_board_provider, config):
+        """
+        Tests that the session of the jira client is tuned and reused by
+        further connects.
+        """
+        client = Mock()
+        client._session = requests.Session()
+        with patch(
+            "src.core.provider.jiraprovider.JIRA", return_value=client
+        ) as jira:
+            assert jira_board_provider.connect()
+            assert jira_board_provider.connect()
+
+        jira.assert_called_once()
+        assert jira.call_args[1]["timeout"] == (
+            config.JIRA_CONNECT_TIMEOUT,
+            config.JIRA_READ_TIMEOUT,
+        )
+        adapter = client._session.get_adapter("https://jira.example.com")
+        assert adapter._pool_maxsize == config.JIRA_POOL_SIZE
+        assert adapter.max_retries.connect == config.JIRA_TRANSPORT_RETRIES
+        assert adapter.max_retries.status == 0
+        assert not adapter.max_retries.respect_retry_after_header
+        assert "gzip" in client._session.headers["Accept-Encoding"]
+
+    def test_load(self, jira_board_provider, jira_test_issues, config):
         """Tests if the loading of jira packages is working."""
         jira_board_provider._jira = Mock()
         jira_board_provider.is_loaded = True
-        jira_issue = [jira_test_issues]
-        result_list = ResultList(jira_issue, _total=len(jira_issue))
-        jira_board_provider._jira.search_issues.return_value = result_list
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [jira_test_issues]
+        )
         jira_board_provider.load()
 
         assert len(jira_board_provider.get()) != 0
+        # only the fields needed to create the packages are requested
+        params = jira_board_provider._jira._session.get.call_args[1]["params"]
+        fields = params["fields"]
+        assert set(fields.split(",")) == set(config.ISSUE_FIELDS + ["status"])
+
+        # of the loaded issue only its lane and comparable values are kept
+        state = jira_board_provider._issues[jira_test_issues.key]
+        assert state["lane"] == JiraLane.TESTING
+        assert set(state["fields"]) <= set(config.ISSUE_FIELDS)
+        assert state["fields"][config.JIRA_CATALOG_FIELD] == str(
+            jira_test_issues.raw["fields"][config.JIRA_CATALOG_FIELD]["id"]
+        )
+
+    @pytest.mark.parametrize("workers", [1, 4])
+    def test_load_paginated(self, jira_board_provider, config, workers):
+        """
+        Tests that the remaining batches are loaded with their offsets and
+        merged in order, without duplicating issues which are returned twice.
+        """
+        with open(
+            os.path.join(config.JIRA_DUMP_PATH, "firefox_jira_issue.json")
+        ) as f:
+            dump = json.load(f)
+
+        issues = list()
+        for number in range(1200):
+            issue_dump = copy.deepcopy(dump)
+            issue_dump["key"] = f"SWPM-{number}"
+            issue_dump["fields"][config.JIRA_SOFTWARE_VERSION_FIELD] = str(
+                number
+            )
+            issues.append(issue_dump)
+
+        def search(url, params):
+            time.sleep(random() / 100)
+            start_at = params["startAt"]
+            max_results = min(params["maxResults"], 50)
+            # the last issue of the previous batch is returned again
+            start = max(0, start_at - 1)
+            return search_response(
+                issues[start : start_at + max_results],
+                total=len(issues),
+                start_at=start_at,
+            )
+
+        config.JIRA_LOAD_WORKERS = workers
+        jira_board_provider._jira = Mock()
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.side_effect = search
+        jira_board_provider.load()
+
+        assert jira_board_provider._jira._session.get.call_count == 24
+        assert [
+            package.jira_id for package in jira_board_provider.get().values()
+        ] == [issue["key"] for issue in issues]
+        config.restore_defaults()
+
+    def test_iter_packages(self, jira_board_provider, jira_test_issues, config):
+        """
+        Tests that the packages of the first batch are yielded before the
+        remaining batches are loaded and that all packages are available once
+        the iteration finished.
+        """
+        issues = list()
+        for number in range(3):
+            issue_dump = copy.deepcopy(jira_test_issues.raw)
+            issue_dump["key"] = f"SWPM-{number}"
+            issue_dump["fields"][config.JIRA_SOFTWARE_VERSION_FIELD] = str(
+                number
+            )
+            issues.append(issue_dump)
+
+        def search(url, params):
+            start_at = params["startAt"]
+            return search_response(
+                issues[start_at : start_at + 1],
+                total=len(issues),
+                start_at=start_at,
+            )
+
+        config.JIRA_LOAD_WORKERS = 1
+        jira_board_provider._jira = Mock()
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.side_effect = search
+
+        packages = jira_board_provider.iter_packages()
+        assert next(packages).jira_id == "SWPM-0"
+        assert jira_board_provider._jira._session.get.call_count == 1
+        assert [package.jira_id for package in packages] == [
+            "SWPM-1",
+            "SWPM-2",
+        ]
+        assert len(jira_board_provider.get()) == 3
+        assert jira_board_provider._jira._session.get.call_count == 3
+        config.restore_defaults()
+
+    def test_load_token_pagination(self, jira_test_issues, config):
+        """
+        Tests that the enhanced search is paginated by token and that the
+        time of every search request is recorded.
+        """
+        config.JIRA_SEARCH_PAGINATION = "token"
+        issues = list()
+        for number in range(3):
+            issue_dump = copy.deepcopy(jira_test_issues.raw)
+            issue_dump["key"] = f"SWPM-{number}"
+            issue_dump["fields"][config.JIRA_SOFTWARE_VERSION_FIELD] = str(
+                number
+            )
+            issues.append(issue_dump)
+
+        def search(url, params):
+            start_at = int(params.get("nextPageToken", 0))
+            response = {"issues": issues[start_at : start_at + 2]}
+            if start_at + 2 < len(issues):
+                response["nextPageToken"] = str(start_at + 2)
+            else:
+                response["isLast"] = True
+            return Mock(content=json.dumps(response).encode())
+
+        jira_board_provider = JiraBoardProvider("test_instance")
+        jira_board_provider._jira = Mock()
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.side_effect = search
+        jira_board_provider.load()
+
+        jira_board_provider._jira._get_url.assert_called_with("search/jql")
+        assert jira_board_provider._jira._session.get.call_count == 2
+        assert [
+            package.jira_id for package in jira_board_provider.get().values()
+        ] == [issue["key"] for issue in issues]
+        assert [path for path, _ in jira_board_provider.search_timings] == [
+            "search/jql",
+            "search/jql",
+        ]
+        config.restore_defaults()
+
+    def test_load_search_timings(self, jira_board_provider, jira_test_issues):
+        """
+        Tests that only the HTTP call of a search is timed, while the time
+        spent in the scheduler, e.g. for a failed attempt, is recorded apart.
+        """
+        attempts = [JIRAError(status_code=503), None]
+
+        def search(url, params):
+            time.sleep(0.05)
+            error = attempts.pop(0)
+            if error:
+                raise error
+            return search_response([jira_test_issues])
+
+        jira_board_provider._jira = Mock()
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.side_effect = search
+        jira_board_provider._scheduler._backoff = lambda attempt: 0.2
+        jira_board_provider.load()
+
+        ((path, elapsed),) = jira_board_provider.search_timings
+        ((_, waited),) = jira_board_provider.search_waits
+        assert path == "search"
+        assert 0.05 <= elapsed < 0.2
+        # the failed attempt and the backoff after it
+        assert waited >= 0.25
+
+    def test_load_pagination_fallback(self, jira_test_issues, config):
+        """
+        Tests that searches are paginated by offset if jira does not offer
+        the enhanced search.
+        """
+        config.JIRA_SEARCH_PAGINATION = "auto"
+        jira_board_provider = JiraBoardProvider("test_instance")
+        jira_board_provider._jira = Mock()
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._get_url.side_effect = lambda path: path
+        jira_board_provider._jira._session.get.side_effect = [
+            JIRAError(status_code=404),
+            search_response([jira_test_issues]),
+            search_response([jira_test_issues]),
+        ]
+        jira_board_provider.load()
+        jira_board_provider.load()
+
+        assert [
+            call[0][0]
+            for call in jira_board_provider._jira._session.get.call_args_list
+        ] == ["search/jql", "search", "search"]
+        assert len(jira_board_provider.get()) == 1
+        config.restore_defaults()
+
+    def test_load_mirror(self, jira_board_provider, config, tmp_path):
+        """
+        Tests that all issues are loaded into the mirror once, afterwards only
+        the changed ones are loaded and deleted issues are removed when the
+        mirror is reconciled.
+        """
+        with open(
+            os.path.join(config.JIRA_DUMP_PATH, "firefox_jira_issue.json")
+        ) as f:
+            dump = json.load(f)
+
+        def issue(number, version):
+            issue_dump = copy.deepcopy(dump)
+            issue_dump["id"] = str(number)
+            issue_dump["key"] = f"SWPM-{number}"
+            issue_dump["fields"][config.JIRA_SOFTWARE_VERSION_FIELD] = version
+            return issue_dump
+
+        config.JIRA_MIRROR_PATH = str(tmp_path / "mirror.sqlite")
+        jira_board_provider._jira = Mock()
+        jira_board_provider.is_loaded = True
+        search = jira_board_provider._jira._session.get
+
+        search.return_value = search_response(
+            [issue(1, "1.0"), issue(2, "2.0")]
+        )
+        jira_board_provider.load()
+        assert "updated" not in search.call_args[1]["params"]["jql"]
+        assert len(jira_board_provider.get()) == 2
+
+        # only the changed issue is returned
+        changed = [issue(2, "2.1")]
+        search.return_value = search_response(changed)
+        jira_board_provider.load()
+        assert "updated >= -" in search.call_args[1]["params"]["jql"]
+        assert search.call_count == 2
+        assert sorted(jira_board_provider.get()) == [
+            "Firefox ESR EN1.0",
+            "Firefox ESR EN2.1",
+        ]
+
+        # the first issue was deleted
+        config.JIRA_MIRROR_RECONCILE_INTERVAL = 0
+        search.side_effect = [search_response([]), search_response(changed)]
+        jira_board_provider.load()
+        assert search.call_args[1]["params"]["fields"] == "key"
+        assert list(jira_board_provider.get()) == ["Firefox ESR EN2.1"]
+        config.restore_defaults()
 
     def test_check_jira_issue_exists(
         self, jira_board_provider, test_one_package
@@ -64,48 +348,44 @@ class TestJiraBoardProvider:
         test_one_package.jira_id = None
         assert not JiraBoardProvider.check_jira_issue_exists(test_one_package)
 
-    def test__jira_issue_to_package_list(self, jira_board_provider):
+    def test__raw_issue_to_package_list(self):
         """
-        Tests if the `JiraBoardProvider._jira_issue_to_package` throws the
-        correct exception if issue fields are
-        missing
+        Tests if the `JiraBoardProvider._raw_issue_to_package` throws the
+        correct exception if an issue has no fields at all.
         """
-        issue_mock = Mock()
-        issue_mock.fields = None
+        with pytest.raises(JiraIssueMissingFields):
+            JiraBoardProvider._raw_issue_to_package({"fields": None})
 
-        with pytest.raises(AttributeError):
-            jira_board_provider._jira_issue_to_package(issue_mock)
-
-    def test__jira_issue_to_package(self, jira_board_provider, config):
+    def test__raw_issue_to_package(self, jira_test_issues, config):
         """
-        Test whether exceptions are handled/raised correctly.
+        Tests that the JSON of an issue is converted into the matching package
+        and that missing fields are detected.
         """
-        issue = Issue(None, None)
-        issue.fields = Mock()
-
-        for attribute in config.ISSUE_FIELDS:
-            issue.fields.__setattr__(attribute, str(random()))
-
-        try:
-            jira_board_provider._jira_issue_to_package(issue)
-        except AttributeError:
-            assert True
-
-        issue.fields = object
+        package = JiraBoardProvider._raw_issue_to_package(jira_test_issues.raw)
+        assert package.key == "Firefox ESR EN60.8.0"
+        assert package.jira_id == "SWPM-140"
+        assert package.catalog == Catalog.TESTING
+        assert package.jira_lane == JiraLane.TESTING
+        assert package.is_present == Present.PRESENT
+        assert package.promote_date == datetime.strptime(
+            jira_test_issues.raw["fields"][config.JIRA_DUEDATE_FIELD],
+            "%Y-%m-%d",
+        )
+        assert package.state == PackageState.DEFAULT
 
-        try:
-            jira_board_provider._jira_issue_to_package(issue)
-        except JiraIssueMissingFields:
-            assert True
+        raw = copy.deepcopy(jira_test_issues.raw)
+        del raw["fields"][config.JIRA_CATALOG_FIELD]
+        with pytest.raises(JiraIssueMissingFields):
+            JiraBoardProvider._raw_issue_to_package(raw)
 
     def test_update(self, jira_board_provider, jira_test_issues):
         """Tests the update of the jira packages"""
 
         jira_board_provider._jira = Mock()
         jira_board_provider.is_loaded = True
-        jira_issue = [jira_test_issues]
-        result_list = ResultList(jira_issue, _total=len(jira_issue))
-        jira_board_provider._jira.search_issues.return_value = result_list
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [jira_test_issues]
+        )
         jira_board_provider.load()
 
         packages = copy.deepcopy(jira_board_provider.get())
@@ -130,9 +410,9 @@ class TestJiraBoardProvider:
         """Test the update if a new package is inserted"""
         jira_board_provider._jira = Mock()
         jira_board_provider.is_loaded = True
-        jira_issue = [jira_test_issues]
-        result_list = ResultList(jira_issue, _total=len(jira_issue))
-        jira_board_provider._jira.search_issues.return_value = result_list
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [jira_test_issues]
+        )
         jira_board_provider.load()
 
         jira_packages = copy.deepcopy(jira_board_provider.get())
@@ -151,6 +431,336 @@ class TestJiraBoardProvider:
         assert is_exact_match(random_package, jira_package, ["state"])
         assert jira_package.state == PackageState.NEW
 
+    def test_commit_update(self, jira_board_provider, jira_test_issues, config):
+        """
+        Tests that updating an issue does not search for it again and that it
+        is updated directly by its key.
+        """
+        jira_board_provider._jira = Mock()
+        jira_board_provider._dry_run = False
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [jira_test_issues]
+        )
+        jira_board_provider.load()
+
+        package = jira_board_provider._get("Firefox ESR EN60.8.0")
+        package.state = PackageState.UPDATE
+        package.is_present = Present.MISSING
+
+        assert jira_board_provider.commit()
+        jira_board_provider._jira._session.get.assert_called_once()
+        jira_board_provider._jira._get_url.assert_called_with("issue/SWPM-140")
+        # only the changed field is sent
+        jira_board_provider._jira._session.put.assert_called_once()
+        data = jira_board_provider._jira._session.put.call_args[1]["data"]
+        assert json.loads(data) == {
+            "fields": {config.JIRA_PRESENT_FIELD: [{"id": None}]}
+        }
+
+    def test_commit_update_unchanged(
+        self, jira_board_provider, jira_test_issues
+    ):
+        """Tests that an update without any changed field is skipped."""
+        jira_board_provider._jira = Mock()
+        jira_board_provider._dry_run = False
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [jira_test_issues]
+        )
+        jira_board_provider.load()
+
+        jira_board_provider._get("Firefox ESR EN60.8.0").state = (
+            PackageState.UPDATE
+        )
+
+        assert jira_board_provider.commit()
+        jira_board_provider._jira._session.put.assert_not_called()
+        assert jira_board_provider.commit_results == list()
+
+    def test_commit_update_not_loaded(
+        self, jira_board_provider, jira_test_issues
+    ):
+        """
+        Tests that issues which were not loaded are fetched with a single
+        search before they are updated.
+        """
+        jira_board_provider._jira = Mock()
+        jira_board_provider._dry_run = False
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [jira_test_issues]
+        )
+        jira_board_provider.load()
+
+        jira_board_provider._issues.clear()
+        package = jira_board_provider._get("Firefox ESR EN60.8.0")
+        package.state = PackageState.UPDATE
+        package.is_autopromote = JiraAutopromote.NOPROMOTE
+
+        assert jira_board_provider.commit()
+        search = jira_board_provider._jira._session.get
+        assert search.call_count == 2
+        assert "key in (SWPM-140)" in search.call_args[1]["params"]["jql"]
+        jira_board_provider._jira._session.put.assert_called_once()
+
+    def test_commit_update_not_found(
+        self, jira_board_provider, jira_test_issues, config
+    ):
+        """
+        Tests that an issue which could not be fetched again is updated with
+        all fields and transitioned, instead of aborting the commit.
+        """
+        jira_board_provider._jira = Mock()
+        jira_board_provider._dry_run = False
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [jira_test_issues]
+        )
+        jira_board_provider.load()
+
+        jira_board_provider._issues.clear()
+        jira_board_provider._jira._session.get.return_value = search_response(
+            []
+        )
+        package = jira_board_provider._get("Firefox ESR EN60.8.0")
+        package.state = PackageState.UPDATE
+        jira_board_provider._jira.transitions.return_value = [
+            {"id": "21", "name": package.catalog.transition_id}
+        ]
+
+        assert jira_board_provider.commit()
+        data = jira_board_provider._jira._session.put.call_args[1]["data"]
+        assert json.loads(data)["fields"] == json.loads(
+            json.dumps(jira_board_provider._issue_fields(package))
+        )
+        jira_board_provider._jira.transition_issue.assert_called_once_with(
+            "SWPM-140", "21"
+        )
+        assert all(r.ok for r in jira_board_provider.commit_results)
+
+    def test_commit_new(self, jira_board_provider, random_package, config):
+        """
+        Tests that new packages are created in bulk, that errors are mapped
+        back to their packages and that only created issues are transitioned.
+        """
+        jira_board_provider._jira = Mock()
+        jira_board_provider._dry_run = False
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.return_value = search_response(
+            []
+        )
+        jira_board_provider.load()
+
+        failing_package = copy.deepcopy(random_package)
+        failing_package.name = "failing"
+        for package in (random_package, failing_package):
+            package.jira_id = None
+            package.jira_lane = JiraLane.TESTING
+            jira_board_provider.update(package)
+
+        jira_board_provider._jira._session.post.return_value = Mock(
+            text=json.dumps(
+                {
+                    "issues": [{"id": "500", "key": "SWPM-500"}],
+                    "errors": [
+                        {
+                            "status": 400,
+                            "elementErrors": {"errors": {"summary": "empty"}},
+                            "failedElementNumber": 1,
+                        }
+                    ],
+                }
+            )
+        )
+        created = {
+            "id": "500",
+            "key": "SWPM-500",
+            "fields": {"status": {"name": "To Development"}},
+        }
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [created]
+        )
+        jira_board_provider._jira.transitions.return_value = [
+            {"id": "31", "name": random_package.catalog.transition_id.upper()}
+        ]
+
+        assert jira_board_provider.commit()
+        jira_board_provider._jira._get_url.assert_any_call("issue/bulk")
+        data = json.loads(
+            jira_board_provider._jira._session.post.call_args[1]["data"]
+        )
+        assert len(data["issueUpdates"]) == 2
+        fields = data["issueUpdates"][0]["fields"]
+        assert fields[config.JIRA_PROJECT_FIELD] == {
+            "key": config.JIRA_PROJECT_KEY
+        }
+        assert fields[config.JIRA_ISSUE_TYPE_FIELD] == {
+            "name": config.JIRA_ISSUE_TYPE
+        }
+        assert fields[config.JIRA_SUMMARY_FIELD] == random_package.key
+        jira_board_provider._jira.transition_issue.assert_called_once_with(
+            "SWPM-500", "31"
+        )
+        assert [
+            (result.key, result.operation, result.ok)
+            for result in jira_board_provider.commit_results
+        ] == [
+            (random_package.key, "create", True),
+            (failing_package.key, "create", False),
+            (random_package.key, "transition", True),
+        ]
+        assert jira_board_provider._get(random_package.key).jira_id == (
+            "SWPM-500"
+        )
+
+    def test_transition_issue_cached(self, config, tmp_path):
+        """
+        Tests that the transitions are only looked up once, kept on disk and
+        looked up again once jira rejects a cached id.
+        """
+        config.JIRA_TRANSITIONS_CACHE_PATH = str(tmp_path / "transitions.json")
+        name = config.JIRA_TESTING_TRANSITION_NAME
+        jira = Mock()
+        jira.transitions.return_value = [{"id": 31, "name": name}]
+
+        jira_board_provider = JiraBoardProvider("test_instance")
+        jira_board_provider._jira = jira
+        for key in ("SWPM-1", "SWPM-2"):
+            jira_board_provider._transition_issue(key, name)
+        jira_board_provider._transitions.save()
+        jira.transitions.assert_called_once_with(
+            "SWPM-1", expand="transitions.fields"
+        )
+        jira.transition_issue.assert_called_with("SWPM-2", "31")
+
+        # a new run uses the ids cached on disk
+        jira_board_provider = JiraBoardProvider("test_instance")
+        jira_board_provider._jira = jira
+        jira.transitions.return_value = [{"id": 41, "name": name}]
+        jira.transition_issue.side_effect = [
+            JIRAError(
+                status_code=400,
+                text="Transition id '31' is not valid for this issue.",
+            ),
+            None,
+        ]
+        jira_board_provider._transition_issue("SWPM-3", name)
+        assert jira.transitions.call_count == 2
+        jira.transition_issue.assert_called_with("SWPM-3", "41")
+        config.restore_defaults()
+
+    def test_transition_issue_cached_invalid_field(self, config):
+        """
+        Tests that an error which does not concern the transition is raised
+        without dropping the cached transitions and sending it again.
+        """
+        name = config.JIRA_TESTING_TRANSITION_NAME
+        response = Mock()
+        response.json.return_value = {
+            "errorMessages": [],
+            "errors": {config.JIRA_CATALOG_FIELD: "Option id 1 is not valid"},
+        }
+        jira = Mock()
+        jira.transitions.return_value = [{"id": 31, "name": name}]
+        jira.transition_issue.side_effect = [
+            None,
+            JIRAError(status_code=400, response=response),
+        ]
+
+        jira_board_provider = JiraBoardProvider("test_instance")
+        jira_board_provider._jira = jira
+        jira_board_provider._transition_issue("SWPM-1", name)
+        with pytest.raises(JIRAError):
+            jira_board_provider._transition_issue("SWPM-2", name)
+
+        jira.transitions.assert_called_once()
+        assert jira.transition_issue.call_count == 2
+        assert (
+            jira_board_provider._transitions.get(
+                jira_board_provider._workflow(), name
+            )
+            == "31"
+        )
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            "{",
+            "[]",
+            '{"WORKFLOW": []}',
+            # the format of older versions, which only cached the ids
+            '{"WORKFLOW": {"NAME": "31"}}',
+            '{"WORKFLOW": {"NAME": {"id": "31"}}}',
+        ],
+    )
+    def test_transition_cache_invalid(self, config, tmp_path, content):
+        """
+        Tests that a cache on disk which cannot be used is discarded and the
+        transitions are looked up again.
+        """
+        name = config.JIRA_TESTING_TRANSITION_NAME
+        path = tmp_path / "transitions.json"
+        path.write_text(
+            content.replace("WORKFLOW", JiraBoardProvider._workflow()).replace(
+                "NAME", name
+            )
+        )
+        config.JIRA_TRANSITIONS_CACHE_PATH = str(path)
+        jira = Mock()
+        jira.transitions.return_value = [{"id": 41, "name": name}]
+
+        jira_board_provider = JiraBoardProvider("test_instance")
+        jira_board_provider._jira = jira
+        jira_board_provider._transition_issue("SWPM-1", name)
+
+        jira.transitions.assert_called_once()
+        jira.transition_issue.assert_called_once_with("SWPM-1", "41")
+        config.restore_defaults()
+
+    @pytest.mark.parametrize("on_screen", [True, False])
+    def test_commit_update_and_transition(
+        self, jira_board_provider, jira_test_issues, config, on_screen
+    ):
+        """
+        Tests that changed fields are set by the transition if they are on
+        its screen and are updated separately otherwise.
+        """
+        jira_board_provider._jira = Mock()
+        jira_board_provider._dry_run = False
+        jira_board_provider.is_loaded = True
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [jira_test_issues]
+        )
+        jira_board_provider.load()
+
+        package = jira_board_provider._get("Firefox ESR EN60.8.0")
+        package.state = PackageState.UPDATE
+        package.catalog = Catalog.PRODUCTION
+        package.jira_lane = JiraLane.PRODUCTION
+        screen = {config.JIRA_CATALOG_FIELD: {}} if on_screen else {}
+        jira_board_provider._jira.transitions.return_value = [
+            {
+                "id": "51",
+                "name": config.JIRA_PRODUCTION_TRANSITION_NAME,
+                "fields": screen,
+            }
+        ]
+
+        assert jira_board_provider.commit()
+        fields = {config.JIRA_CATALOG_FIELD: {"id": Catalog.PRODUCTION.value}}
+        if on_screen:
+            jira_board_provider._jira._session.put.assert_not_called()
+            jira_board_provider._jira.transition_issue.assert_called_once_with(
+                "SWPM-140", "51", fields=fields
+            )
+        else:
+            data = jira_board_provider._jira._session.put.call_args[1]["data"]
+            assert json.loads(data) == {"fields": fields}
+            jira_board_provider._jira.transition_issue.assert_called_once_with(
+                "SWPM-140", "51"
+            )
+
     def test_update_jira_from_repo(
         self, munki_repo_provider, jira_board_provider
     ):
@@ -160,9 +770,9 @@ class TestJiraBoardProvider:
 
         jira_board_provider._jira = Mock()
         jira_board_provider.is_loaded = True
-        jira_issue = []
-        result_list = ResultList(jira_issue, _total=len(jira_issue))
-        jira_board_provider._jira.search_issues.return_value = result_list
+        jira_board_provider._jira._session.get.return_value = search_response(
+            []
+        )
         jira_board_provider.load()
 
         assert len(munki_repo_provider.get()) != 0
@@ -172,6 +782,284 @@ class TestJiraBoardProvider:
 
         assert len(jira_board_provider.get()) != 0
 
+    def test_update_jira_from_repo_streaming(
+        self, jira_board_provider, jira_test_issues, random_package, config
+    ):
+        """
+        Tests that a board which was not loaded yet is loaded once while the
+        munki packages are compared with it.
+        """
+        raw = copy.deepcopy(jira_test_issues.raw)
+        raw["fields"][config.JIRA_PRESENT_FIELD] = None
+        jira_board_provider._jira = Mock()
+        jira_board_provider.connect = Mock(return_value=True)
+        jira_board_provider._jira._session.get.return_value = search_response(
+            [raw]
+        )
+
+        munki_package = jira_board_provider._raw_issue_to_package(raw)
+        jira_board_provider.update_jira_from_repo(
+            {
+                munki_package.key: munki_package,
+                random_package.key: random_package,
+            }
+        )
+
+        jira_board_provider._jira._session.get.assert_called_once()
+        jira_package = jira_board_provider._get(munki_package.key)
+        assert jira_package.is_present == Present.PRESENT
+        assert jira_package.state == PackageState.UPDATE
+        assert jira_board_provider._get(random_package.key).state == (
+            PackageState.NEW
+        )
+
+
+class TestJiraBoardProviderFakeServer:
+    @staticmethod
+    def _provider(fake_jira: FakeJiraServer) -> JiraBoardProvider:
+        provider = JiraBoardProvider("test_instance", dry_run=False)
+        # keeps the backoff after injected server errors short
+        provider._scheduler.backoff_base = 0.01
+        assert provider.connect(fake_jira.connection_params)
+        return provider
+
+    @pytest.mark.parametrize("pagination", ["offset", "token"])
+    def test_load(self, fake_jira, config, pagination):
+        """Tests that all issues are loaded page by page over HTTP."""
+        config.JIRA_SEARCH_PAGINATION = pagination
+        issues = fake_jira.add_packages(1050)
+        provider = self._provider(fake_jira)
+        provider.load()
+
+        assert [package.jira_id for package in provider.get().values()] == [
+            issue["key"] for issue in issues
+        ]
+        endpoint = "search/jql" if pagination == "token" else "search"
+        assert fake_jira.requests[f"GET {endpoint}"] == 11
+        config.restore_defaults()
+
+    def test_commit(self, fake_jira, random_package, config):
+        """
+        Tests that new issues are created and transitioned and existing ones
+        are updated and transitioned over HTTP.
+        """
+        fake_jira.add_packages(2)
+        provider = self._provider(fake_jira)
+        provider.load()
+
+        existing = list(provider.get().values())[0]
+        existing.state = PackageState.UPDATE
+        existing.catalog = Catalog.PRODUCTION
+        existing.jira_lane = JiraLane.TO_PRODUCTION
+        existing.is_present = Present.MISSING
+
+        random_package.jira_id = None
+        random_package.catalog = Catalog.TESTING
+        random_package.jira_lane = JiraLane.TO_TESTING
+        provider.update(random_package)
+
+        assert provider.commit()
+        assert all(result.ok for result in provider.commit_results)
+        assert fake_jira.requests["POST issue/bulk"] == 1
+
+        updated = fake_jira.issues[existing.jira_id]["fields"]
+        assert updated["status"] == {"name": JiraLane.TO_PRODUCTION.value}
+        assert updated[config.JIRA_PRESENT_FIELD] == [{"id": None}]
+        created = fake_jira.issues[provider._get(random_package.key).jira_id]
+        assert created["fields"]["status"] == {
+            "name": JiraLane.TO_TESTING.value
+        }
+
+    def test_commit_transitions(self, fake_jira, config):
+        """
+        Tests that the ids of transitions which are only available in certain
+        statuses are looked up once each and cached for the whole workflow.
+        """
+        fake_jira.workflow = {
+            JiraLane.TO_DEVELOPMENT: [config.JIRA_TESTING_TRANSITION_NAME],
+            JiraLane.TO_TESTING: [config.JIRA_PRODUCTION_TRANSITION_NAME],
+        }
+        statuses = [JiraLane.TO_DEVELOPMENT, JiraLane.TO_TESTING] * 3
+        for number, status in enumerate(statuses):
+            fake_jira.add_issue(package_fields(number), status)
+        provider = self._provider(fake_jira)
+        provider.load()
+
+        targets = {
+            JiraLane.TO_DEVELOPMENT: (Catalog.TESTING, JiraLane.TO_TESTING),
+            JiraLane.TO_TESTING: (Catalog.PRODUCTION, JiraLane.TO_PRODUCTION),
+        }
+        for package in provider.get().values():
+            package.state = PackageState.UPDATE
+            package.catalog, package.jira_lane = targets[package.jira_lane]
+
+        assert provider.commit()
+        assert all(result.ok for result in provider.commit_results)
+        assert fake_jira.requests["GET issue/{key}/transitions"] == 2
+        assert fake_jira.requests["POST issue/{key}/transitions"] == 6
+        for package in provider.get().values():
+            status = fake_jira.issues[package.jira_id]["fields"]["status"]
+            assert status == {"name": package.jira_lane.value}
+
+    def test_commit_transition_unavailable(self, fake_jira, config):
+        """
+        Tests that an issue fails to be transitioned if the transition is not
+        available in its status, while other issues are still transitioned.
+        """
+        fake_jira.workflow = {
+            JiraLane.TO_TESTING: [config.JIRA_PRODUCTION_TRANSITION_NAME]
+        }
+        fake_jira.add_issue(package_fields(0), JiraLane.TO_TESTING)
+        fake_jira.add_issue(package_fields(1), JiraLane.TESTING)
+        provider = self._provider(fake_jira)
+        provider.load()
+
+        lanes = dict()
+        for package in provider.get().values():
+            lanes[package.key] = package.jira_lane
+            package.state = PackageState.UPDATE
+            package.catalog = Catalog.PRODUCTION
+            package.jira_lane = JiraLane.TO_PRODUCTION
+
+        assert provider.commit()
+        results = {r.key: r for r in provider.commit_results}
+        for key, lane in lanes.items():
+            issue = fake_jira.issues[provider._get(key).jira_id]
+            status = issue["fields"]["status"]["name"]
+            if lane == JiraLane.TO_TESTING:
+                assert results[key].ok
+                assert status == JiraLane.TO_PRODUCTION.value
+            else:
+                assert isinstance(results[key].error, JIRAError)
+                assert status == lane.value
+
+    @pytest.mark.parametrize(
+        "field, value",
+        [
+            ("project", "PROJECT"),
+            ("project", {"key": "OTHER"}),
+            ("project", {}),
+            ("issuetype", "Task"),
+            ("issuetype", {"name": "Other"}),
+            ("issuetype", None),
+            ("summary", ""),
+        ],
+    )
+    def test_create_invalid_fields(self, fake_jira, config, field, value):
+        """
+        Tests that the fake server rejects the fields of an issue like jira,
+        e.g. a project which is not referenced by an object.
+        """
+        name = {
+            "project": config.JIRA_PROJECT_FIELD,
+            "issuetype": config.JIRA_ISSUE_TYPE_FIELD,
+            "summary": config.JIRA_SUMMARY_FIELD,
+        }[field]
+        fields = {**package_fields(0), name: value}
+        if value is None:
+            fields.pop(name)
+
+        response = requests.post(
+            f"{fake_jira.url}{API_PATH}issue", json={"fields": fields}
+        )
+        assert response.status_code == 400
+        assert set(response.json()["errors"]) == {name}
+        assert not fake_jira.issues
+
+        fields = package_fields(0)
+        fields[config.JIRA_PROJECT_FIELD] = {"id": PROJECT_ID}
+        response = requests.post(
+            f"{fake_jira.url}{API_PATH}issue", json={"fields": fields}
+        )
+        assert response.status_code == 201
+
+    def test_load_faults(self, fake_jira):
+        """
+        Tests that throttled and failed requests are retried until all issues
+        are loaded.
+        """
+        fake_jira.throttle_rate = 0.2
+        fake_jira.failure_rate = 0.1
+        fake_jira.retry_after = 0.01
+        fake_jira.add_packages(1000)
+        provider = self._provider(fake_jira)
+        provider.load()
+
+        assert len(provider.get()) == 1000
+        assert fake_jira.requests["GET search"] > 10
+
+
+class TestJiraWriteExecutor:
+    def test_run_order(self):
+        """
+        Tests that the operations of an issue are executed in order and that
+        the results are returned in the given order.
+        """
+        calls = list()
+
+        def operation(key, name):
+            def run(previous):
+                time.sleep(random() / 100)
+                calls.append((key, name, previous))
+                return name
+
+            return name, run
+
+        operations = {
+            str(key): [operation(str(key), name) for name in ("a", "b", "c")]
+            for key in range(20)
+        }
+        results = JiraWriteExecutor(max_in_flight=8).run(operations)
+
+        assert [(result.key, result.operation) for result in results] == [
+            (key, name) for key in operations for name in ("a", "b", "c")
+        ]
+        assert all(result.ok for result in results)
+        for key in operations:
+            assert [call for call in calls if call[0] == key] == [
+                (key, "a", None),
+                (key, "b", "a"),
+                (key, "c", "b"),
+            ]
+
+    def test_run_error(self):
+        """
+        Tests that an error is collected and the remaining operations of the
+        issue are skipped, while other issues are still written.
+        """
+
+        def fail(_previous):
+            raise ValueError("failed")
+
+        ok = Mock(return_value=None)
+        results = JiraWriteExecutor(max_in_flight=2).run(
+            {"a": [("create", fail), ("transition", ok)], "b": [("update", ok)]}
+        )
+
+        assert isinstance(results[0].error, ValueError)
+        assert results[1].skipped and not results[1].ok
+        assert results[2].ok
+        ok.assert_called_once()
+
+    @pytest.mark.parametrize("max_in_flight", [1, 3])
+    def test_run_max_in_flight(self, max_in_flight):
+        """Tests that no more than `max_in_flight` operations run at once."""
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def operation(_previous):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+
+        JiraWriteExecutor(max_in_flight).run(
+            {str(key): [("update", operation)] for key in range(12)}
+        )
+        assert in_flight[1] == max_in_flight
+
 
 @pytest.mark.usefixtures("run_makecatalogs_before")
 class TestMunkiRepoProvider:
@@ -193,6 +1081,165 @@ class TestMunkiRepoProvider:
     def test_get(self):
         pass
 
+    @pytest.mark.parametrize(
+        "workers, executor", [(1, "thread"), (4, "thread"), (2, "process")]
+    )
+    def test_load_pkg_infos_parallel(
+        self, munki_repo_provider, config, workers, executor
+    ):
+        """
+        Tests that the pkg infos are the same no matter how many workers are
+        used or which executor is used to read them.
+        """
+        config.PKGS_INFO_LOAD_WORKERS = 1
+        munki_repo_provider._load_pkg_infos()
+        expected = copy.deepcopy(munki_repo_provider._pkg_info_files)
+        assert len(expected) != 0
+
+        config.PKGS_INFO_LOAD_WORKERS = workers
+        config.PKGS_INFO_LOAD_EXECUTOR = executor
+        munki_repo_provider._load_pkg_infos()
+
+        assert munki_repo_provider._pkg_info_files == expected
+        config.restore_defaults()
+
+    @pytest.mark.parametrize("source", ["pkgsinfo", "all"])
+    def test_load_single_source(self, munki_repo_provider, config, source):
+        """
+        Tests that reading the packages from a single source results in the
+        same packages as reading them from the catalogs.
+        """
+        munki_repo_provider.load()
+        packages = copy.deepcopy(munki_repo_provider.get())
+
+        config.PACKAGES_SOURCE = source
+        munki_repo_provider.load()
+
+        assert packages.keys() == munki_repo_provider.get().keys()
+        for key, package in munki_repo_provider.get().items():
+            assert is_exact_match(
+                packages.get(key), package, ["promote_date", "munki_uuid"]
+            )
+        assert munki_repo_provider._pkg_infos_loaded == (source == "pkgsinfo")
+        config.restore_defaults()
+
+    def test_load_with_index(self, munki_repo_provider, config, tmp_path):
+        """
+        Tests that a warm load from the pkg info index does not parse any plist
+        and results in the same packages and pkg info paths as a cold load.
+        """
+        config.PKGS_INFO_INDEX_PATH = str(tmp_path / "index.sqlite")
+        munki_repo_provider.load()
+        packages = copy.deepcopy(munki_repo_provider.get())
+        pkg_info_paths = copy.deepcopy(munki_repo_provider._pkg_info_files)
+
+        with patch("plistlib.load", wraps=plistlib.load) as load_mock, patch(
+            "src.core.provider.munkiprovider._read_pkg_info"
+        ) as read_mock:
+            munki_repo_provider.load()
+            # only the items stored in the index are parsed, no files
+            assert all(
+                isinstance(call[0][0], io.BytesIO)
+                for call in load_mock.call_args_list
+            )
+            read_mock.assert_not_called()
+
+        assert packages.keys() == munki_repo_provider.get().keys()
+        for key, package in munki_repo_provider.get().items():
+            assert is_exact_match(
+                packages.get(key), package, ["promote_date", "munki_uuid"]
+            )
+        assert munki_repo_provider._pkg_info_files == pkg_info_paths
+        config.restore_defaults()
+
+    def test_index_types(self, tmp_path):
+        """
+        Tests that indexed values are returned with the types plistlib parses,
+        and that an index of an older format is rebuilt.
+        """
+        path = str(tmp_path / "index.sqlite")
+        with sqlite3.connect(path) as db:
+            db.execute(
+                "CREATE TABLE files ("
+                "path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, items TEXT)"
+            )
+            db.execute("INSERT INTO files VALUES ('old', 0, 0, '[]')")
+        db.close()
+
+        stat = os.stat(path)
+        item = {
+            "name": "Firefox",
+            "catalogs": ["testing"],
+            "munkipromote": {"date": datetime(2019, 7, 16), "data": b"\x00"},
+            "installs": [],
+        }
+        with PkgInfoIndex(path) as index:
+            assert index.get("old", os.stat_result((0,) * 10)) is None
+            index.put("new", stat, [item])
+        with PkgInfoIndex(path) as index:
+            items = index.get("new", stat)
+
+        item.pop("installs")
+        assert items == [item]
+        munkipromote = items[0]["munkipromote"]
+        assert isinstance(munkipromote["date"], datetime)
+        assert isinstance(munkipromote["data"], bytes)
+
+    def test_commit(self, munki_repo_provider, config, tmp_path):
+        """
+        Tests that only the catalogs of an updated pkg info are changed when it
+        is written and that all other keys are kept.
+        """
+        config.DEBUG_PKGS_INFO_SAVE_PATH = str(tmp_path)
+        munki_repo_provider._dry_run = False
+        munki_repo_provider.load()
+
+        # only paths are kept in memory, the plists are read in commit
+        pkg_info_path = munki_repo_provider._pkg_info_files.get(
+            "Firefox ESR EN"
+        ).get("60.8.0")
+        assert isinstance(pkg_info_path, str)
+
+        package = munki_repo_provider.get().get("Firefox ESR EN60.8.0")
+        package.catalog = Catalog.PRODUCTION
+        package.state = PackageState.UPDATE
+        assert munki_repo_provider.commit()
+
+        # only the catalogs array is replaced, the rest of the file is kept
+        with open(pkg_info_path, "rb") as f:
+            expected = f.read().replace(
+                b"<string>testing</string>", b"<string>production</string>"
+            )
+        with open(tmp_path / os.path.basename(pkg_info_path), "rb") as f:
+            assert f.read() == expected
+        config.restore_defaults()
+
+    def test_commit_unreadable(self, munki_repo_provider, config, tmp_path):
+        """
+        Tests that a pkg info which can not be read does not prevent the other
+        pkg infos from being written.
+        """
+        config.DEBUG_PKGS_INFO_SAVE_PATH = str(tmp_path)
+        munki_repo_provider._dry_run = False
+        munki_repo_provider.load()
+
+        package = munki_repo_provider.get().get("Firefox ESR EN60.8.0")
+        package.catalog = Catalog.PRODUCTION
+        package.state = PackageState.UPDATE
+        # another version whose pkg info is deleted after loading
+        missing = copy.deepcopy(package)
+        missing.version = Package.str_to_version("60.4.0")
+        munki_repo_provider._packages_dict.update({missing.key: missing})
+        versions = munki_repo_provider._pkg_info_files.get(package.name)
+        versions["60.4.0"] = str(tmp_path / "missing.plist")
+
+        with patch("subprocess.run"):
+            assert munki_repo_provider.commit()
+        assert os.listdir(tmp_path) == [
+            os.path.basename(versions.get("60.8.0"))
+        ]
+        config.restore_defaults()
+
     def test_update_existing_package(self, munki_repo_provider):
         """Tests the update of an existing package"""
         munki_repo_provider.load()
@@ -239,6 +1286,68 @@ class TestMunkiRepoProvider:
             and munki_package.state is PackageState.NEW
         )
 
+    def test_commit_unchanged(self, munki_repo_provider, config, tmp_path):
+        """
+        Tests that neither the pkg info is written nor makecatalogs is run if
+        the catalogs of an updated package did not change.
+        """
+        config.DEBUG_PKGS_INFO_SAVE_PATH = str(tmp_path)
+        config.CATALOG_BUILDER = "makecatalogs"
+        munki_repo_provider._dry_run = False
+        munki_repo_provider.load()
+
+        package = munki_repo_provider.get().get("Firefox ESR EN60.8.0")
+        package.state = PackageState.UPDATE
+
+        with patch("subprocess.run") as run_mock:
+            assert munki_repo_provider.commit()
+            run_mock.assert_not_called()
+        assert os.listdir(tmp_path) == []
+        config.restore_defaults()
+
+    def test_make_catalogs_native(self, config, tmp_path):
+        """
+        Tests that the native catalog builder only moves the written pkg info
+        between the catalogs and keeps all other items as they are.
+        """
+        shutil.copytree(config.REPO_PATH, tmp_path / "repo")
+        config.REPO_PATH = str(tmp_path / "repo")
+        with open(os.path.join(config.CATALOGS_PATH, "all"), "rb") as f:
+            all_items = plistlib.load(f)
+
+        pkg_info_path = os.path.join(
+            config.PKGS_INFO_PATH,
+            "apps/firefox/en/Firefox ESR EN-60.8.0.plist",
+        )
+        with open(pkg_info_path, "rb") as f:
+            pkg_info = plistlib.load(f)
+        pkg_info.update({"catalogs": ["production"]})
+
+        with patch("subprocess.run") as run_mock:
+            MunkiRepoProvider.make_catalogs([pkg_info])
+            run_mock.assert_not_called()
+
+        all_items[3].update({"catalogs": ["production"]})
+        catalogs = dict()
+        for catalog in ["all", "testing", "production"]:
+            with open(os.path.join(config.CATALOGS_PATH, catalog), "rb") as f:
+                catalogs[catalog] = plistlib.load(f)
+
+        assert catalogs.get("all") == all_items
+        assert catalogs.get("testing") == all_items[:3]
+        assert catalogs.get("production") == all_items
+        config.restore_defaults()
+
+    def test_make_catalogs_native_fallback(self, config, random_package):
+        """
+        Tests that makecatalogs is run if the catalogs can not be updated
+        incrementally.
+        """
+        pkg_info = {"name": random_package.name, "version": "1.0"}
+        with patch("subprocess.run") as run_mock:
+            MunkiRepoProvider.make_catalogs([pkg_info])
+            run_mock.assert_called_once()
+
     def test_make_catalogs_subprocess_error(self, config):
         """Tests the make catalog if the repo path is wrong"""
         config.REPO_PATH = "/some/path/which/does/not/exist"
@@ -5,10 +5,45 @@
 #
 #  Developed by Tom Cinbis and Tim Königl on 16/07/2019, 13:04
 
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock
+
 import pytest
+from jira import JIRAError
 
 from src.utils import logger as log
+from src.utils.fileio import write_files_atomically
 from src.utils.config import JiraLane, Catalog, JiraAutopromote
+from src.utils.ratelimit import (
+    AdaptiveConcurrencyLimit,
+    RequestScheduler,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    """Clock whose sleep only advances the time."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = list()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def jira_error(status_code: int, headers: dict = None) -> JIRAError:
+    return JIRAError(
+        status_code=status_code,
+        response=SimpleNamespace(
+            status_code=status_code, headers=headers or {}, text=""
+        ),
+    )
 
 
 class TestUtils:
@@ -71,3 +106,117 @@ class TestUtils:
         assert JiraLane.DEVELOPMENT.to_jira_rest_dict() == {
             "id": JiraLane.DEVELOPMENT.value
         }
+
+    def test_write_files_atomically(self, tmp_path):
+        """
+        Tests that files are replaced with their mode kept, that a failing
+        file does not abort the others and that no temporary files are left.
+        """
+        existing = tmp_path / "existing.plist"
+        existing.write_bytes(b"old")
+        os.chmod(existing, 0o640)
+        files = {
+            str(existing): b"new",
+            str(tmp_path / "created.plist"): b"created",
+            str(tmp_path / "missing" / "failing.plist"): b"failing",
+        }
+
+        results = write_files_atomically(files, workers=2, batch_size=2)
+
+        assert results.get(str(existing)) is None
+        assert results.get(str(tmp_path / "created.plist")) is None
+        assert isinstance(
+            results.get(str(tmp_path / "missing" / "failing.plist")),
+            FileNotFoundError,
+        )
+        assert existing.read_bytes() == b"new"
+        assert os.stat(existing).st_mode & 0o777 == 0o640
+        assert (tmp_path / "created.plist").read_bytes() == b"created"
+        assert sorted(os.listdir(tmp_path)) == [
+            "created.plist",
+            "existing.plist",
+        ]
+
+    def test_token_bucket(self):
+        """Tests that the bucket allows a burst and then limits the rate."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, clock=clock, sleep=clock.sleep)
+        for _ in range(30):
+            bucket.acquire()
+
+        # the first ten requests are sent at once, the others one per 100ms
+        assert clock.now == pytest.approx(2.0)
+
+    def test_adaptive_concurrency_limit(self):
+        """Tests the additive increase and multiplicative decrease."""
+        limit = AdaptiveConcurrencyLimit(initial=8, maximum=8)
+        limit.acquire()
+        limit.release(overloaded=True)
+        assert limit.limit == 4
+        limit.acquire()
+        limit.release(overloaded=False)
+        assert limit.limit == 4.25
+        for _ in range(100):
+            limit.acquire()
+            limit.release(overloaded=True)
+        assert limit.limit == 1
+
+    def test_request_scheduler_retry_after(self):
+        """Tests that throttled requests are retried after Retry-After."""
+        clock = FakeClock()
+        scheduler = RequestScheduler(
+            max_concurrency=4, clock=clock, sleep=clock.sleep
+        )
+        function = Mock(
+            side_effect=[jira_error(429, {"Retry-After": "7"}), "result"]
+        )
+
+        assert scheduler.call(function, "a", b=1) == "result"
+        function.assert_called_with("a", b=1)
+        assert clock.now == 7
+        assert scheduler.concurrency.limit == 2.5
+
+    def test_request_scheduler_server_error(self):
+        """
+        Tests that server errors are retried with a backoff until the retries
+        are exhausted.
+        """
+        clock = FakeClock()
+        scheduler = RequestScheduler(
+            max_retries=3, backoff_base=1, clock=clock, sleep=clock.sleep
+        )
+        function = Mock(side_effect=jira_error(503))
+
+        with pytest.raises(JIRAError):
+            scheduler.call(function)
+        assert function.call_count == 4
+        for attempt, sleep in enumerate(clock.sleeps):
+            assert 0 <= sleep <= 2**attempt
+
+    def test_request_scheduler_not_idempotent(self):
+        """
+        Tests that requests which are not idempotent are only retried if they
+        were throttled.
+        """
+        clock = FakeClock()
+        scheduler = RequestScheduler(clock=clock, sleep=clock.sleep)
+        function = Mock(
+            side_effect=[jira_error(429), "result", jira_error(502)]
+        )
+
+        assert scheduler.call(function, idempotent=False) == "result"
+        with pytest.raises(JIRAError):
+            scheduler.call(function, idempotent=False)
+        assert function.call_count == 3
+        function.assert_called_with()
+
+    def test_request_scheduler_client_error(self):
+        """Tests that other errors are raised without retrying."""
+        clock = FakeClock()
+        scheduler = RequestScheduler(clock=clock, sleep=clock.sleep)
+        function = Mock(side_effect=jira_error(400))
+
+        with pytest.raises(JIRAError):
+            scheduler.call(function)
+        function.assert_called_once()
+        assert not clock.sleeps